@@ -1,4 +1,4 @@
-from decouple import config
+from decouple import Csv, config
 
 import os
 
@@ -33,16 +33,21 @@ INSTALLED_APPS = [
     'dal_select2',
     'dal_queryset_sequence',
     'bootstrap_datepicker_plus',
+    'rest_framework',
 
     'projects',
     'projects.accounts',
+    'projects.api',
     'projects.core',
+    'projects.dashboard',
     'projects.education',
 ]
 
 MIDDLEWARE = [
+    'projects.dashboard.instrumentation.SQLInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'projects.core.db.ReplicaStickinessMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -85,6 +90,17 @@ DATABASES = {
     }
 }
 
+# Read replicas of the default database, one per host, used by the dashboard
+# list and autocomplete views. After a write the session reads the primary
+# for DATABASE_REPLICA_STICKY_SECONDS so it sees its own changes.
+DATABASE_REPLICAS = []
+for index, host in enumerate(config('DATABASE_REPLICA_HOSTS', default='', cast=Csv())):
+    DATABASE_REPLICAS.append('replica%d' % (index + 1))
+    DATABASES[DATABASE_REPLICAS[-1]] = dict(DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'})
+
+DATABASE_ROUTERS = ['projects.core.db.ReplicaRouter']
+DATABASE_REPLICA_STICKY_SECONDS = 15
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -138,3 +154,25 @@ LOGIN_REDIRECT_URL = '/dashboard'
 BOOTSTRAP4 = {
     'include_jquery': True,
 }
+
+# Dashboard tables: exact row counts are cached in this cache for this many
+# seconds, and unfiltered tables bigger than the threshold show a planner
+# estimate. With several workers, point the cache at a shared backend.
+DASHBOARD_COUNT_CACHE = 'default'
+DASHBOARD_COUNT_CACHE_TIMEOUT = 300
+DASHBOARD_COUNT_ESTIMATE_THRESHOLD = 100000
+
+# Autocompletes answer from in-process indexes, which look for the writes of
+# other processes at most this many seconds apart.
+DASHBOARD_PREFIX_INDEX_CHECK_INTERVAL = 5
+
+# Read-only API for integrations (projects.api), for staff users.
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ),
+    'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.IsAdminUser',),
+    'DEFAULT_PAGINATION_CLASS': 'projects.api.pagination.IndexedCursorPagination',
+    'PAGE_SIZE': 100,
+}
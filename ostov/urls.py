@@ -8,6 +8,7 @@ handler404 = 'projects.core.views.handle_404'
 handler500 = 'projects.core.views.handle_500'
 
 urlpatterns = [
+    path('api/', include(('projects.api.urls', 'api'), namespace='api')),
     path('dashboard/', include(('projects.dashboard.urls', 'dashboard'), namespace='dashboard')),
     path('', include(('projects.core.urls', 'core'), namespace='core')),
 ]
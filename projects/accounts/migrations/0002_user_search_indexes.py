@@ -0,0 +1,32 @@
+from django.db import migrations
+
+# Case-insensitive prefix indexes for the user autocomplete (see
+# projects.dashboard.search.search_prefix). PostgreSQL only.
+SEARCH_COLUMNS = ('username', 'first_name', 'last_name')
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS accounts_user_%s_lower ON accounts_user (lower(%s) text_pattern_ops)' % (
+                column, column))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute('DROP INDEX IF EXISTS accounts_user_%s_lower' % column)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
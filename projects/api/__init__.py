@@ -0,0 +1 @@
+default_app_config = 'projects.api.apps.ApiConfig'
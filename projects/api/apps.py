@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+from django.utils.translation import ugettext_lazy as _
+
+
+class ApiConfig(AppConfig):
+    label = 'api'
+    name = 'projects.api'
+    verbose_name = _('API')
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IndexedCursorPagination(CursorPagination):
+    """
+    ``CursorPagination`` on the ordering of the view, which must be one
+    ``OrderingFilter`` allows, i.e. backed by an index. Pages seek from the
+    cursor instead of counting rows or using OFFSET.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from rest_framework import serializers
+from projects.education.models import Course, EducationGroup, Lecture, Student, Teacher
+
+User = get_user_model()
+
+
+class SparseFieldsetMixin(object):
+    """
+    Serializer taking the *fields* to keep, for the ``fields`` query
+    parameter of ``projects.api.views.ReadOnlyViewSet``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super(SparseFieldsetMixin, self).__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = User
+        fields = ('id', 'username')
+
+
+class EducationGroupSummarySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = EducationGroup
+        fields = ('id', 'name')
+
+
+class TeacherSummarySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Teacher
+        fields = ('id', 'last_name', 'first_name')
+
+
+class CourseSummarySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Course
+        fields = ('id', 'title')
+
+
+class StudentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    user = UserSummarySerializer(read_only=True)
+    education_groups = EducationGroupSummarySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Student
+        fields = ('id', 'last_name', 'first_name', 'birth_date', 'active', 'user', 'education_groups')
+
+
+class EducationGroupSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = EducationGroup
+        fields = ('id', 'name', 'description', 'active', 'student_count', 'lecture_count')
+
+
+class TeacherSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    user = UserSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Teacher
+        fields = ('id', 'last_name', 'first_name', 'birth_date', 'active', 'user')
+
+
+class CourseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = Course
+        fields = ('id', 'title', 'description', 'active')
+
+
+class LectureSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    course = CourseSummarySerializer(read_only=True)
+    teachers = TeacherSummarySerializer(many=True, read_only=True)
+    groups = EducationGroupSummarySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Lecture
+        fields = ('id', 'title', 'description', 'course', 'start', 'finish', 'teachers', 'groups')
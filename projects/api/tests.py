@@ -0,0 +1,173 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone, translation
+from projects.education.models import Course, EducationGroup, Lecture, Teacher
+
+from .views import EducationGroupViewSet
+
+User = get_user_model()
+
+START = timezone.make_aware(datetime.datetime(2018, 3, 22, 8), timezone.utc)
+
+
+class ApiTestMixin(object):
+
+    def walk(self, url, data):
+        """
+        Follow the next links from *url*, returning the rows of every page.
+        """
+        rows, pages = [], 0
+        response = self.client.get(url, data)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            rows.extend(response.data['results'])
+            pages += 1
+            self.assertLess(pages, 50)
+            if not response.data['next']:
+                return rows
+            response = self.client.get(response.data['next'])
+
+
+class ReadOnlyViewSetTests(ApiTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', is_staff=True)
+        # Equal names must neither be skipped nor repeated across pages.
+        cls.groups = [EducationGroup.objects.create(name='Group %d' % (index % 4)) for index in range(11)]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('api:educationgroup-list')
+
+    def test_cursor_pages(self):
+        rows = self.walk(self.url, {'page_size': 3})
+        self.assertEqual([row['id'] for row in rows], sorted(group.pk for group in self.groups))
+        self.assertNotIn('count', self.client.get(self.url).data)
+
+    def test_ordering_with_equal_values(self):
+        for ordering in ('name', '-name'):
+            with self.subTest(ordering=ordering):
+                rows = self.walk(self.url, {'page_size': 3, 'ordering': ordering})
+                # The primary key breaks ties ascending whatever the direction of the name.
+                expected = sorted(self.groups, key=lambda group: group.pk)
+                expected.sort(key=lambda group: group.name, reverse=ordering.startswith('-'))
+                self.assertEqual([row['id'] for row in rows], [group.pk for group in expected])
+
+    def test_fields(self):
+        response = self.client.get(self.url, {'fields': 'name'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name'})
+        response = self.client.get(self.url, {'fields': 'name,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', str(response.data['fields']))
+
+    def test_retrieve(self):
+        group = self.groups[0]
+        response = self.client.get(reverse('api:educationgroup-detail', args=[group.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], group.name)
+
+    def test_queryset_is_built_once(self):
+        loaded = mock.Mock(wraps=EducationGroupViewSet.get_loaded_queryset)
+        with mock.patch.object(EducationGroupViewSet, 'get_loaded_queryset', autospec=True, side_effect=loaded):
+            self.assertEqual(self.client.get(self.url, {'ordering': 'name'}).status_code, 200)
+            self.assertEqual(loaded.call_count, 1)
+            group = self.groups[0]
+            self.assertEqual(self.client.get(reverse('api:educationgroup-detail', args=[group.pk])).status_code, 200)
+            self.assertEqual(loaded.call_count, 2)
+
+    def test_staff_only(self):
+        self.client.force_login(User.objects.create_user('student'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.logout()
+        self.assertIn(self.client.get(self.url).status_code, (401, 403))
+
+
+class NestedFieldsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', is_staff=True)
+        course = Course.objects.create(title='Algebra')
+        teacher = Teacher.objects.create(last_name='Noether', first_name='Emmy', birth_date=datetime.date(1882, 3, 23))
+        group = EducationGroup.objects.create(name='A1')
+        for hour in range(6):
+            start = START + datetime.timedelta(hours=hour)
+            lecture = Lecture.objects.create(
+                title='Algebra', course=course, start=start, finish=start + datetime.timedelta(minutes=45))
+            lecture.teachers.add(teacher)
+            lecture.groups.add(group)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('api:lecture-list')
+
+    def count_queries(self, data):
+        self.client.get(self.url, data)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, data)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_relations_are_loaded_with_the_page(self):
+        response, queries = self.count_queries({})
+        lecture = response.data['results'][0]
+        self.assertEqual(lecture['course']['title'], 'Algebra')
+        self.assertEqual([teacher['last_name'] for teacher in lecture['teachers']], ['Noether'])
+        self.assertEqual([group['name'] for group in lecture['groups']], ['A1'])
+        start = START + datetime.timedelta(days=1)
+        Lecture.objects.create(
+            title='Geometry', course=Course.objects.get(), start=start, finish=start + datetime.timedelta(hours=1))
+        self.assertEqual(self.count_queries({})[1], queries)
+
+    def test_fields_skip_relations(self):
+        response, queries = self.count_queries({'fields': 'title,start'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'start'})
+        self.assertLess(queries, self.count_queries({})[1])
+
+
+class ETagTests(TransactionTestCase):
+    """
+    List endpoints answer 304 until a write to their tables commits.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('staff', is_staff=True)
+        self.client.force_login(self.user)
+        Course.objects.create(title='Algebra')
+        self.url = reverse('api:course-list')
+
+    def test_not_modified_until_a_write(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Course.objects.create(title='Geometry')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([row['title'] for row in response.data['results']], ['Algebra', 'Geometry'])
+
+    def test_etags_differ_per_user_and_url(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(self.url, {'fields': 'title'})['ETag'], etag)
+        self.client.force_login(User.objects.create_user('other', is_staff=True))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etags_differ_per_format_and_language(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(self.url, HTTP_ACCEPT='text/html')['ETag'], etag)
+        with translation.override('de'):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
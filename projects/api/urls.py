@@ -0,0 +1,12 @@
+from rest_framework import routers
+
+from .views import CourseViewSet, EducationGroupViewSet, LectureViewSet, StudentViewSet, TeacherViewSet
+
+router = routers.DefaultRouter()
+router.register('students', StudentViewSet)
+router.register('groups', EducationGroupViewSet)
+router.register('teachers', TeacherViewSet)
+router.register('courses', CourseViewSet)
+router.register('lectures', LectureViewSet)
+
+urlpatterns = router.urls
@@ -0,0 +1,142 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from projects.dashboard import views
+from projects.dashboard.views import ReplicaReadMixin
+from projects.education.models import Course, EducationGroup, Lecture, Student, Teacher
+
+from .serializers import (
+    CourseSerializer, EducationGroupSerializer, LectureSerializer, StudentSerializer, TeacherSerializer)
+
+
+class VersionETagMixin(views.VersionETagMixin):
+    """
+    ``projects.dashboard.views.VersionETagMixin`` for API views. DRF only
+    authenticates the request and picks the format inside its ``dispatch()``,
+    so the ETag is computed in ``list()`` and ``retrieve()`` instead, keyed
+    on the format too. The stamps are read from the database the queryset
+    is, so a lagging replica cannot pair new stamps with old rows.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        # Skip the dashboard mixin, the request is not authenticated yet.
+        return super(views.VersionETagMixin, self).dispatch(request, *args, **kwargs)
+
+    def get_etag_parts(self, request):
+        return super(VersionETagMixin, self).get_etag_parts(request) + (request.accepted_renderer.format,)
+
+    def get_etag_database(self):
+        return self.get_queryset().db
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super(VersionETagMixin, self).list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super(VersionETagMixin, self).retrieve, request, *args, **kwargs)
+
+
+class UniqueOrderingFilter(OrderingFilter):
+    """
+    ``OrderingFilter`` ending the ordering with the primary key, so rows
+    with equal values keep one order and the cursor pages neither skip nor
+    repeat them.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super(UniqueOrderingFilter, self).get_ordering(request, queryset, view) or ())
+        if not any(name.lstrip('-') in ('id', 'pk') for name in ordering):
+            ordering.append('id')
+        return ordering
+
+
+class ReadOnlyViewSet(VersionETagMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only endpoint of a model paged with ``IndexedCursorPagination`` on
+    *ordering_fields*. ``?fields=a,b`` limits the serialized fields, and the
+    columns and relations loaded with them: embedded relations are joined
+    or prefetched, a page always takes one query plus one per many-to-many
+    field. The queryset is built once per request.
+    """
+    filter_backends = (UniqueOrderingFilter,)
+    ordering_fields = ('id',)
+    ordering = ('id',)
+    fields_param = 'fields'
+
+    def get_requested_fields(self):
+        available = list(self.get_serializer_class()().fields)
+        value = self.request.query_params.get(self.fields_param)
+        if not value:
+            return available
+        requested = set(name.strip() for name in value.split(',') if name.strip())
+        unknown = requested - set(available)
+        if unknown:
+            raise ValidationError({self.fields_param: 'Unknown fields: %s.' % ', '.join(sorted(unknown))})
+        # The id is what clients sync on.
+        return [name for name in available if name in requested or name == 'id']
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super(ReadOnlyViewSet, self).get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        if getattr(self, '_queryset', None) is None:
+            self._queryset = self.get_loaded_queryset(super(ReadOnlyViewSet, self).get_queryset())
+        return self._queryset
+
+    def get_loaded_queryset(self, queryset):
+        opts = queryset.model._meta
+        fields = self.get_serializer_class()().fields
+        # The cursor is built from the ordering fields of the last row.
+        only = set(name.lstrip('-') for name in UniqueOrderingFilter().get_ordering(self.request, queryset, self))
+        select_related, prefetch_related = [], []
+        for name in self.get_requested_fields():
+            field = fields[name]
+            try:
+                model_field = opts.get_field(field.source)
+            except FieldDoesNotExist:
+                return queryset
+            nested = getattr(field, 'child', field)
+            if model_field.many_to_many:
+                related = model_field.related_model._default_manager.only(
+                    *[child.source for child in nested.fields.values()]).order_by('pk')
+                prefetch_related.append(Prefetch(field.source, queryset=related))
+            elif model_field.is_relation:
+                select_related.append(field.source)
+                only.add(field.source)
+                only.update('%s__%s' % (field.source, child.source) for child in nested.fields.values())
+            else:
+                only.add(model_field.name)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset.only(*sorted(only))
+
+
+class StudentViewSet(ReadOnlyViewSet):
+    queryset = Student.objects.all()
+    serializer_class = StudentSerializer
+
+
+class EducationGroupViewSet(ReadOnlyViewSet):
+    queryset = EducationGroup.objects.all()
+    serializer_class = EducationGroupSerializer
+    ordering_fields = ('id', 'name')
+
+
+class TeacherViewSet(ReadOnlyViewSet):
+    queryset = Teacher.objects.all()
+    serializer_class = TeacherSerializer
+
+
+class CourseViewSet(ReadOnlyViewSet):
+    queryset = Course.objects.all()
+    serializer_class = CourseSerializer
+
+
+class LectureViewSet(ReadOnlyViewSet):
+    queryset = Lecture.objects.all()
+    serializer_class = LectureSerializer
+    ordering_fields = ('id', 'start')
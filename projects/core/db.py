@@ -0,0 +1,86 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Session key holding the time until which the session reads the primary.
+STICKY_SESSION_KEY = '_replica_sticky_until'
+
+_local = threading.local()
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def has_written():
+    return getattr(_local, 'written', False)
+
+
+def reset_written():
+    _local.written = False
+
+
+class ReplicaRouter(object):
+    """
+    Sends every write to the primary, also for objects read from a replica,
+    and notes it for ``ReplicaStickinessMiddleware``. Reads are left to
+    Django, which uses the primary or the database of the related instance,
+    so only querysets a view pins with ``get_read_database()`` hit a replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        return None
+
+    def db_for_write(self, model, **hints):
+        _local.written = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = set([DEFAULT_DB_ALIAS] + get_replicas())
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware(object):
+    """
+    Make the session read from the primary for
+    ``DATABASE_REPLICA_STICKY_SECONDS`` after a request which wrote, so the
+    page shown after saving never lags behind the save. Goes after
+    ``SessionMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reset_written()
+        response = self.get_response(request)
+        if has_written() and hasattr(request, 'session'):
+            request.session[STICKY_SESSION_KEY] = time.time() + settings.DATABASE_REPLICA_STICKY_SECONDS
+        reset_written()
+        return response
+
+
+def get_read_database(request):
+    """
+    Return the replica alias *request* may read from, the same one for the
+    whole request, or ``None`` for the primary: without replicas, for other
+    methods than GET and HEAD and while the session is sticky.
+    """
+    if not hasattr(request, '_read_database'):
+        replicas = get_replicas()
+        sticky = hasattr(request, 'session') and request.session.get(STICKY_SESSION_KEY, 0) > time.time()
+        if replicas and request.method in ('GET', 'HEAD') and not sticky:
+            request._read_database = random.choice(replicas)
+        else:
+            request._read_database = None
+    return request._read_database
@@ -0,0 +1 @@
+default_app_config = 'projects.dashboard.apps.DashboardConfig'
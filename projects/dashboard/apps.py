@@ -1,4 +1,6 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.utils.translation import ugettext_lazy as _
 
 
@@ -6,3 +8,35 @@ class DashboardConfig(AppConfig):
     label = 'dashboard'
     name = 'projects.dashboard'
     verbose_name = _('Dashboard')
+
+    def ready(self):
+        from . import group_counts, stats
+        from .search import register_sqlite_functions
+        from .versions import touch_sender
+
+        post_save.connect(touch_sender, dispatch_uid='dashboard-versions-save')
+        post_delete.connect(touch_sender, dispatch_uid='dashboard-versions-delete')
+        m2m_changed.connect(touch_sender, dispatch_uid='dashboard-versions-m2m')
+        connection_created.connect(register_sqlite_functions, dispatch_uid='dashboard-search-sqlite')
+
+        for model in stats.TRACKERS:
+            uid = 'dashboard-stats-%s' % model._meta.label_lower
+            pre_save.connect(stats.pre_save_handler, sender=model, dispatch_uid=uid + '-pre-save')
+            post_save.connect(stats.post_save_handler, sender=model, dispatch_uid=uid + '-post-save')
+            pre_delete.connect(stats.pre_delete_handler, sender=model, dispatch_uid=uid + '-pre-delete')
+        for model in set(stats.TRACKERS) | set(stats.OBJECT_STATISTICS):
+            post_delete.connect(
+                stats.post_delete_handler, sender=model,
+                dispatch_uid='dashboard-stats-%s-post-delete' % model._meta.label_lower)
+        for through in stats.RELATIONS:
+            m2m_changed.connect(
+                stats.m2m_changed_handler, sender=through,
+                dispatch_uid='dashboard-stats-%s-m2m' % through._meta.label_lower)
+        for through in group_counts.RELATIONS:
+            m2m_changed.connect(
+                group_counts.m2m_changed_handler, sender=through,
+                dispatch_uid='dashboard-group-counts-%s-m2m' % through._meta.label_lower)
+        for model, relation, counter in group_counts.COUNTERS:
+            pre_delete.connect(
+                group_counts.pre_delete_handler, sender=model,
+                dispatch_uid='dashboard-group-counts-%s-pre-delete' % model._meta.label_lower)
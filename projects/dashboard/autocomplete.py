@@ -0,0 +1,141 @@
+import bisect
+import hashlib
+import itertools
+import json
+import threading
+import time
+import uuid
+
+from django import http
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import six
+from django.utils.http import quote_etag
+from django.utils.translation import get_language
+
+from .versions import get_version
+
+# Seconds between checks of the shared version stamp for writes of other processes.
+PREFIX_INDEX_CHECK_INTERVAL = getattr(settings, 'DASHBOARD_PREFIX_INDEX_CHECK_INTERVAL', 5)
+
+
+class PrefixIndex(object):
+    """
+    Per-process index of a small reference table for prefix lookups on one
+    field. Entries are kept sorted by casefolded key so a lookup is a
+    ``bisect`` plus a short scan, in memory. The index is rebuilt lazily:
+    saves and deletes in this process bump a local generation once they
+    commit, and the version stamp of the table (see
+    ``projects.dashboard.versions``) is read at most every *check_interval*
+    seconds for the writes of other processes and set-based writes.
+    """
+
+    def __init__(self, model, field, check_interval=None):
+        self.model = model
+        self.field = field
+        self.check_interval = PREFIX_INDEX_CHECK_INTERVAL if check_interval is None else check_interval
+        # Generations only mean something in this process, ETags carry the token too.
+        self.token = uuid.uuid4().hex
+        self.generations = itertools.count(1)
+        self.generation = 0
+        self.state = (None, None, (), ())
+        self.checked = None
+        self.lock = threading.Lock()
+        post_save.connect(self.changed, sender=model)
+        post_delete.connect(self.changed, sender=model)
+
+    def __repr__(self):
+        return '<PrefixIndex %s.%s>' % (self.model._meta.label, self.field)
+
+    @staticmethod
+    def fold(value):
+        return six.text_type(value or '').casefold()
+
+    def build(self):
+        entries = sorted(
+            (self.fold(getattr(obj, self.field)), obj.pk, six.text_type(obj))
+            for obj in self.model._default_manager.all().iterator())
+        return tuple(key for key, pk, label in entries), tuple((pk, label) for key, pk, label in entries)
+
+    def changed(self, using=None, **kwargs):
+        transaction.on_commit(self.invalidate, using=using)
+
+    def invalidate(self):
+        self.generation = next(self.generations)
+
+    def get_state(self):
+        """
+        Return the current ``(version, generation, keys, entries)`` of the
+        index.
+        """
+        state, now = self.state, time.monotonic()
+        if state[1] == self.generation and self.checked is not None and now - self.checked < self.check_interval:
+            return state
+        version = get_version(self.model)
+        with self.lock:
+            # A write committing during the build bumps the generation again.
+            generation = self.generation
+            state = self.state
+            if state[0] != version or state[1] != generation:
+                state = self.state = (version, generation) + self.build()
+            self.checked = now
+        return state
+
+    def search(self, prefix, exclude=(), offset=0, limit=None):
+        """
+        Return ``(entries, more)`` where *entries* are the ``(pk, label)``
+        pairs whose key starts with *prefix*, in key order, after skipping
+        *offset* of them and leaving out the pks in *exclude*. *more* tells
+        whether entries beyond *limit* exist.
+        """
+        version, generation, keys, entries = self.get_state()
+        prefix = self.fold(prefix)
+        exclude = set(six.text_type(pk) for pk in exclude)
+        found = []
+        for index in range(bisect.bisect_left(keys, prefix), len(keys)):
+            if not keys[index].startswith(prefix):
+                break
+            if exclude and six.text_type(entries[index][0]) in exclude:
+                continue
+            if offset:
+                offset -= 1
+                continue
+            if limit is not None and len(found) == limit:
+                return found, True
+            found.append(entries[index])
+        return found, False
+
+
+class PrefixIndexAutocompleteMixin(object):
+    """
+    Answer a ``Select2QuerySetView`` from a ``PrefixIndex`` instead of the
+    database. *forward_exclude* names the forwarded field listing the pks
+    already selected. The ETag of ``VersionETagMixin`` is taken from the
+    state of the index, so a lookup runs no query either.
+    """
+    prefix_index = None
+    forward_exclude = None
+
+    def get_etag(self, request):
+        version, generation = self.prefix_index.get_state()[:2]
+        key = repr((
+            request.get_full_path(), request.user.pk, get_language(), self.prefix_index.token, version, generation))
+        return quote_etag(hashlib.md5(key.encode('utf-8')).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        results, more = [], False
+        if request.user.is_authenticated:
+            try:
+                page = max(int(request.GET.get(self.page_kwarg) or 1), 1)
+            except ValueError:
+                page = 1
+            exclude = self.forwarded.get(self.forward_exclude, None) or ()
+            if not isinstance(exclude, (list, tuple)):
+                exclude = [exclude]
+            results, more = self.prefix_index.search(
+                self.q, exclude=exclude, offset=(page - 1) * self.paginate_by, limit=self.paginate_by)
+        return http.HttpResponse(json.dumps({
+            'results': [{'id': six.text_type(pk), 'text': label} for pk, label in results],
+            'pagination': {'more': more},
+        }), content_type='application/json')
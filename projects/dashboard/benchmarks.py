@@ -0,0 +1,235 @@
+import datetime
+import json
+import platform
+import subprocess
+import time
+from contextlib import ExitStack
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.template import Context, Template
+from django.test import Client, RequestFactory
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from django_tables2 import RequestConfig
+from projects.education.models import Course, EducationGroup, Lecture, Student, Teacher
+from projects.education.timetable import find_conflicts
+
+from .counts import get_count
+from .education.forms import LectureForm, LectureSeriesForm, StudentForm
+from .education.tables import CourseTable, EducationGroupTable, LectureTable, StudentTable, TeacherTable
+from .education.urls import urlpatterns
+from .instrumentation import QueryStats
+from .stats import get_home_stats
+
+User = get_user_model()
+
+BENCHMARK_USERNAME = 'benchmark'
+
+TABLE_TEMPLATE = Template('{% load django_tables2 %}{% render_table table %}')
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def measure(function, repeat):
+    """
+    Call *function* once to warm caches, then *repeat* times, and return
+    the timings in seconds with the queries of the last call.
+    """
+    function()
+    timings = []
+    for index in range(repeat):
+        stats = QueryStats()
+        with ExitStack() as stack:
+            for db in connections.all():
+                stack.enter_context(db.execute_wrapper(stats))
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'min': timings[0],
+        'median': timings[len(timings) // 2],
+        'p95': timings[min(int(len(timings) * 0.95), len(timings) - 1)],
+        'mean': sum(timings) / len(timings),
+        'queries': stats.count,
+        'duplicate_queries': stats.duplicates,
+    }
+
+
+class Benchmark(object):
+    """
+    Times the dashboard against the current database, normally one filled
+    by the ``seed_education`` command: every URL of
+    ``projects.dashboard.education.urls`` and the model and form hot paths
+    in ``get_functions()``, among them every education table rendered with
+    and without ``DashboardTable.render_rows()``.
+    """
+    # Query strings for URLs which need one to do their usual work.
+    url_params = {
+        'education-user-autocomplete': {'q': 'Ka'},
+        'education-group-autocomplete': {'q': 'KA'},
+        'education-teacher-autocomplete': {'q': 'Ka'},
+        'education-course-autocomplete': {'q': 'Ge'},
+        'education-student-autocomplete': {'q': 'Ka'},
+        'education-student-list': {'last_name': 'Kamar'},
+    }
+    # Rows of the table rendering benchmarks.
+    table_rows = 100
+
+    def __init__(self, repeat=10, select=None):
+        self.repeat = repeat
+        self.select = select
+        user = User.objects.filter(username=BENCHMARK_USERNAME).first()
+        if user is None:
+            user = User.objects.create_user(BENCHMARK_USERNAME, is_staff=True)
+        self.user = user
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.force_login(user)
+
+    def get_urls(self):
+        """
+        Yield ``(name, url, query)`` for the URLs to time. Those taking a pk
+        get the one of the first object of the view's model.
+        """
+        now = timezone.now()
+        params = dict(self.url_params)
+        params['education-lecture-calendar'] = {
+            'start': (now - datetime.timedelta(days=now.weekday())).date().isoformat(),
+            'end': (now + datetime.timedelta(days=7 - now.weekday())).date().isoformat(),
+        }
+        for pattern in urlpatterns:
+            if not isinstance(pattern, URLPattern):
+                continue
+            kwargs = {}
+            if 'pk' in pattern.pattern.converters:
+                model = pattern.callback.view_class.model
+                pk = model._default_manager.order_by('pk').values_list('pk', flat=True).first()
+                if pk is None:
+                    continue
+                kwargs['pk'] = pk
+            name = pattern.name
+            yield name, reverse('dashboard:%s' % name, kwargs=kwargs), params.get(name, {})
+            if name in params and name.endswith('-list'):
+                yield name + ' unfiltered', reverse('dashboard:%s' % name), {}
+
+    def get_functions(self):
+        """
+        Yield ``(name, function)`` for the model and form hot paths.
+        """
+        student = Student.objects.order_by('pk').first()
+        lecture = Lecture.objects.order_by('pk').first()
+        yield 'student count', lambda: get_count(Student.objects.all())
+        yield 'student count filtered', lambda: get_count(Student.objects.filter(active=False))
+        yield 'home stats', get_home_stats
+        if student is not None:
+            data = {
+                'last_name': student.last_name, 'first_name': student.first_name,
+                'birth_date': student.birth_date.isoformat(), 'active': 'on',
+                'education_groups': list(student.education_groups.values_list('pk', flat=True)),
+            }
+            yield 'student form', lambda: StudentForm(data, instance=student).is_valid()
+        if lecture is not None:
+            teachers = list(lecture.teachers.values_list('pk', flat=True))
+            groups = list(lecture.groups.values_list('pk', flat=True))
+            yield 'lecture conflicts', lambda: find_conflicts(
+                lecture.start, lecture.finish, teachers, groups, exclude=lecture.pk)
+            data = {
+                'title': lecture.title, 'description': lecture.description, 'course': lecture.course_id,
+                'start': timezone.localtime(lecture.start).strftime('%Y-%m-%d %H:%M:%S'),
+                'finish': timezone.localtime(lecture.finish).strftime('%Y-%m-%d %H:%M:%S'),
+                'teachers': teachers, 'groups': groups,
+            }
+            yield 'lecture form', lambda: LectureForm(data, instance=lecture).is_valid()
+            first_date = timezone.localdate()
+            series = dict(
+                data, first_date=first_date.isoformat(),
+                last_date=(first_date + datetime.timedelta(days=120)).isoformat(),
+                start_time='10:00', finish_time='11:30', weekdays=['0', '3'], interval='1')
+            yield 'lecture series form', lambda: LectureSeriesForm(series).is_valid()
+        for table_class in (StudentTable, EducationGroupTable, TeacherTable, CourseTable, LectureTable):
+            select_related, prefetch_related = table_class.get_related_lookups()
+            records = list(table_class._meta.model._default_manager.select_related(*select_related).prefetch_related(
+                *prefetch_related)[:self.table_rows])
+            if records:
+                name = '%s table' % table_class._meta.model._meta.model_name
+                yield name, partial(self.render_table, table_class, records, True)
+                yield name + ' template rows', partial(self.render_table, table_class, records, False)
+
+    def run(self, progress=None):
+        results = []
+        for name, url, query in self.get_urls():
+            results.append(self.run_one('url', name, lambda: self.get(url, query), url=url, query=query))
+            if progress is not None:
+                progress(results[-1])
+        for name, function in self.get_functions():
+            results.append(self.run_one('function', name, function))
+            if progress is not None:
+                progress(results[-1])
+        return {
+            'created': timezone.now().isoformat(),
+            'commit': get_commit(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'rows': dict((model._meta.model_name, model._default_manager.count()) for model in (
+                User, EducationGroup, Teacher, Course, Student, Lecture)),
+            'repeat': self.repeat,
+            'results': [result for result in results if result is not None],
+        }
+
+    def run_one(self, kind, name, function, **extra):
+        if self.select and not any(part in name for part in self.select):
+            return None
+        result = {'kind': kind, 'name': name}
+        result.update(extra)
+        result.update(measure(function, self.repeat))
+        return result
+
+    def render_table(self, table_class, records, fast_rows):
+        """
+        Render a page of *records* in *table_class* as the list views do,
+        with the rows written by ``render_rows()`` or by the template.
+        """
+        request = RequestFactory().get('/')
+        request.user = self.user
+        table = table_class(records)
+        table.fast_rows = fast_rows
+        RequestConfig(request, paginate={'per_page': self.table_rows}).configure(table)
+        return TABLE_TEMPLATE.render(Context({'table': table, 'request': request}))
+
+    def get(self, url, query):
+        response = self.client.get(url, query)
+        if response.status_code != 200:
+            raise BenchmarkError('GET %s returned %d' % (url, response.status_code))
+        return response
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current, threshold=1.2):
+    """
+    Yield ``(name, before, after, ratio, regressed)`` for the results of
+    *current* also in *previous*. *ratio* compares the median timings, a
+    result regressed when it exceeds *threshold* or more queries are run.
+    """
+    before = dict(((result['kind'], result['name']), result) for result in previous['results'])
+    for result in current['results']:
+        old = before.get((result['kind'], result['name']))
+        if old is None or not old['median']:
+            continue
+        ratio = result['median'] / old['median']
+        yield result['name'], old, result, ratio, ratio > threshold or result['queries'] > old['queries']
+
+
+def dump(results, stream):
+    json.dump(results, stream, indent=2, sort_keys=True)
+    stream.write('\n')
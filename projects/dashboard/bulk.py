@@ -0,0 +1,148 @@
+import abc
+from collections import OrderedDict
+
+from django import forms
+from django.core.exceptions import FieldDoesNotExist
+from django.db import router, transaction
+from django.db.models import BooleanField
+from django.utils import six
+from django.utils.translation import ugettext_lazy as _, ungettext_lazy
+
+from . import stats
+from .versions import touch
+
+
+@six.add_metaclass(abc.ABCMeta)
+class BulkAction(object):
+    """
+    Action on the rows selected in a ``DashboardListView``. ``run()`` gets a
+    queryset of them and changes them with set-based statements, without
+    loading them, returning the number of rows changed.
+    """
+    name = None
+    label = None
+    message = ungettext_lazy('%d row changed', '%d rows changed')
+
+    def is_available(self, model):
+        return True
+
+    def get_fields(self):
+        """
+        Return the extra fields of ``BulkActionForm`` the action needs.
+        """
+        return {}
+
+    def clean(self, data):
+        pass
+
+    @abc.abstractmethod
+    def run(self, queryset, data):
+        """
+        Change the rows of *queryset* with the cleaned form *data* and return
+        how many were changed.
+        """
+
+
+class SetActiveAction(BulkAction):
+    message = ungettext_lazy('%d row updated', '%d rows updated')
+
+    def __init__(self, name, label, active):
+        self.name = name
+        self.label = label
+        self.active = active
+
+    def is_available(self, model):
+        try:
+            return isinstance(model._meta.get_field('active'), BooleanField)
+        except FieldDoesNotExist:
+            return False
+
+    def run(self, queryset, data):
+        with stats.bulk_tracked(queryset):
+            count = queryset.exclude(active=self.active).update(active=self.active)
+        touch(queryset.model)
+        return count
+
+
+class DeleteAction(BulkAction):
+    name = 'delete'
+    label = _('Delete')
+    message = ungettext_lazy('%d row deleted', '%d rows deleted')
+
+    def run(self, queryset, data):
+        return bulk_delete(queryset)
+
+
+def bulk_delete(queryset):
+    """
+    Delete the objects of *queryset* in one transaction with
+    ``QuerySet.delete()``, so ``on_delete`` rules and the delete signals
+    apply, and return how many were deleted. The statistics of the objects
+    are updated with aggregate queries rather than per row. Raises
+    ``ProtectedError`` like ``delete()``.
+    """
+    model = queryset.model
+    with transaction.atomic(using=router.db_for_write(model)):
+        # Concurrent edits of the rows wait for the delete.
+        list(queryset.select_for_update().order_by('pk').values_list('pk', flat=True))
+        with stats.bulk_tracked(queryset), stats.untracked():
+            deleted, counts = queryset.delete()
+    return counts.get(model._meta.label, 0)
+
+
+class SelectionField(forms.Field):
+    """
+    The pks of the rows ticked in the selection column of the table.
+    """
+    widget = forms.MultipleHiddenInput
+    default_error_messages = {
+        'invalid': _('Select a valid choice.'),
+    }
+
+    def to_python(self, value):
+        try:
+            return [int(pk) for pk in value or ()]
+        except (TypeError, ValueError):
+            raise forms.ValidationError(self.error_messages['invalid'], code='invalid')
+
+
+class BulkActionForm(forms.Form):
+    action = forms.ChoiceField(label=_('Action'))
+    selection = SelectionField(required=False)
+    select_all = forms.BooleanField(label=_('All matching rows'), required=False)
+
+    def __init__(self, actions, *args, **kwargs):
+        super(BulkActionForm, self).__init__(*args, **kwargs)
+        self.actions = OrderedDict((action.name, action) for action in actions)
+        self.fields['action'].choices = [('', '---------')] + [
+            (action.name, action.label) for action in self.actions.values()]
+        for action in self.actions.values():
+            self.fields.update(action.get_fields())
+
+    def get_action(self):
+        return self.actions[self.cleaned_data['action']]
+
+    def clean(self):
+        cleaned_data = super(BulkActionForm, self).clean()
+        if not cleaned_data.get('select_all') and not cleaned_data.get('selection'):
+            raise forms.ValidationError(_('Select the rows to change first.'), code='no_selection')
+        if cleaned_data.get('action') in self.actions:
+            self.actions[cleaned_data['action']].clean(cleaned_data)
+        return cleaned_data
+
+    def run(self, queryset):
+        """
+        Run the chosen action in one transaction on the rows of *queryset*
+        which are selected, or on all of them with *select_all*.
+        """
+        model = queryset.model
+        selection = model._default_manager.filter(pk__in=queryset.order_by().values('pk'))
+        if not self.cleaned_data['select_all']:
+            selection = selection.filter(pk__in=self.cleaned_data['selection'])
+        with transaction.atomic(using=router.db_for_write(model)):
+            return self.get_action().run(selection, self.cleaned_data)
+
+
+ACTIVATE = SetActiveAction('activate', _('Activate'), True)
+DEACTIVATE = SetActiveAction('deactivate', _('Deactivate'), False)
+DELETE = DeleteAction()
@@ -0,0 +1,75 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+from .versions import get_table_versions
+
+# Counts are keyed on the shared version stamps, so any cache is correct; a shared one saves counting per process.
+COUNT_CACHE = getattr(settings, 'DASHBOARD_COUNT_CACHE', 'default')
+COUNT_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_COUNT_CACHE_TIMEOUT', 300)
+COUNT_ESTIMATE_THRESHOLD = getattr(settings, 'DASHBOARD_COUNT_ESTIMATE_THRESHOLD', 100000)
+
+
+class EstimatedCount(int):
+    """
+    Row count taken from the planner statistics rather than ``COUNT(*)``.
+    Behaves as the number for pluralization and pagination but renders as
+    ``~N`` in captions.
+    """
+    estimated = True
+
+    def __str__(self):
+        return '~%d' % self
+
+
+def get_count(queryset):
+    """
+    Return the number of rows in *queryset*, estimated for large unfiltered
+    tables and otherwise counted exactly and cached until the next write to
+    one of the tables involved.
+    """
+    if is_unfiltered(queryset):
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= COUNT_ESTIMATE_THRESHOLD:
+            return EstimatedCount(estimate)
+    return cached_count(queryset)
+
+
+def is_unfiltered(queryset):
+    query = queryset.query
+    return not query.where and not query.distinct and query.low_mark == 0 and query.high_mark is None
+
+
+def estimate_count(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+            [connection.ops.quote_name(queryset.model._meta.db_table)])
+        row = cursor.fetchone()
+    # reltuples is -1 (or 0) for tables that were never analyzed.
+    if not row or row[0] is None or row[0] <= 0:
+        return None
+    return row[0]
+
+
+def cached_count(queryset):
+    queryset = queryset.order_by()
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    versions = get_table_versions((alias.table_name for alias in queryset.query.alias_map.values()), queryset.db)
+    digest = hashlib.md5(repr((sql, params, queryset.db)).encode('utf-8')).hexdigest()
+    key = 'dashboard:count:%s:%s' % (digest, ':'.join(str(version) for table, version in sorted(versions.items())))
+    cache = caches[COUNT_CACHE]
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
@@ -0,0 +1,84 @@
+from dal import autocomplete
+from django import forms
+from django.core.exceptions import FieldDoesNotExist
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import IntegerField, Value
+from django.utils.translation import ugettext_lazy as _, ungettext_lazy
+from projects.dashboard import stats
+from projects.dashboard.bulk import BulkAction
+from projects.dashboard.group_counts import reconcile
+from projects.dashboard.versions import touch
+from projects.education.models import EducationGroup
+
+
+class AssignGroupAction(BulkAction):
+    """
+    Link the selected rows to a group through the many-to-many field
+    *relation*, with one ``INSERT ... SELECT`` of the links missing. Links
+    added concurrently are skipped with ``ON CONFLICT DO NOTHING`` on
+    PostgreSQL; other databases look for the missing links again.
+    """
+    name = 'assign_group'
+    label = _('Add to group')
+    message = ungettext_lazy('%d row added to the group', '%d rows added to the group')
+    attempts = 3
+
+    def __init__(self, relation):
+        self.relation = relation
+
+    def is_available(self, model):
+        try:
+            field = model._meta.get_field(self.relation)
+        except FieldDoesNotExist:
+            return False
+        return field.many_to_many and field.related_model is EducationGroup
+
+    def get_fields(self):
+        return {
+            'group': forms.ModelChoiceField(
+                queryset=EducationGroup.objects.all(), required=False, label=_('Group'),
+                widget=autocomplete.ModelSelect2(url='dashboard:education-group-autocomplete')),
+        }
+
+    def clean(self, data):
+        if data.get('action') == self.name and not data.get('group'):
+            raise forms.ValidationError(_('Choose the group to add the rows to.'), code='required')
+
+    def get_missing(self, queryset, group):
+        """
+        Return the ``(pk, group pk)`` pairs of the links to insert.
+        """
+        return queryset.exclude(**{self.relation: group}).order_by().annotate(
+            bulk_group=Value(group.pk, output_field=IntegerField())).values_list('pk', 'bulk_group')
+
+    def run(self, queryset, data):
+        model, group = queryset.model, data['group']
+        field = model._meta.get_field(self.relation)
+        through = field.remote_field.through
+        using = router.db_for_write(through)
+        connection = connections[using]
+        quote_name = connection.ops.quote_name
+        with stats.bulk_tracked(queryset):
+            for attempt in range(self.attempts):
+                sql, params = self.get_missing(queryset, group).query.sql_with_params()
+                sql = 'INSERT INTO %s (%s, %s) %s' % (
+                    quote_name(through._meta.db_table),
+                    quote_name(through._meta.get_field(field.m2m_field_name()).column),
+                    quote_name(through._meta.get_field(field.m2m_reverse_field_name()).column),
+                    sql)
+                if connection.vendor == 'postgresql':
+                    sql += ' ON CONFLICT DO NOTHING'
+                try:
+                    with transaction.atomic(using=using), connection.cursor() as cursor:
+                        cursor.execute(sql, params)
+                        count = cursor.rowcount
+                except IntegrityError:
+                    # Some rows got linked to the group meanwhile, look again.
+                    if attempt == self.attempts - 1:
+                        raise
+                else:
+                    break
+        if count:
+            reconcile([group.pk])
+            touch(through)
+        return count
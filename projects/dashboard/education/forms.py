@@ -1,11 +1,21 @@
+import datetime
+
 from dal import autocomplete
 from django import forms
 from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.utils import formats, timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.dates import WEEKDAYS
 from django.utils.translation import ugettext_lazy as _
-from bootstrap_datepicker_plus import DateTimePickerInput
+from bootstrap_datepicker_plus import DateTimePickerInput, TimePickerInput
 from projects.education.models import (
     Student, EducationGroup, Teacher, Course, Lecture)
 from projects.core.widgets import DatePickerInput
+from projects.education.timetable import ConflictError, find_batch_conflicts, find_conflicts, lock_resources
+
+from .roster import get_group_students, set_group_students
+from .series import create_series, occurrence_periods, occurrences
 
 User = get_user_model()
 
@@ -43,6 +53,18 @@ class StudentForm(forms.ModelForm):
         fields = '__all__'
 
 
+class StudentImportForm(forms.ModelForm):
+    """
+    Row validation for ``StudentImporter``, ``StudentForm`` without the
+    relations, which the importer resolves in bulk.
+    """
+    birth_date = forms.DateField(required=True)
+
+    class Meta:
+        model = Student
+        fields = ('last_name', 'first_name', 'birth_date', 'active')
+
+
 class StudentSearchForm(forms.Form):
     last_name = forms.CharField(
         max_length=16, required=False, label='',
@@ -62,6 +84,27 @@ class EducationGroupForm(forms.ModelForm):
         fields = '__all__'
 
 
+class EducationGroupRosterForm(forms.Form):
+    """
+    All the students of *group* at once, saved with ``set_group_students()``.
+    """
+    students = forms.ModelMultipleChoiceField(
+        queryset=Student.objects.all(), required=False, label=_('Students'),
+        widget=autocomplete.ModelSelect2Multiple(
+            url='dashboard:education-student-autocomplete',
+            forward=('students',)))
+
+    def __init__(self, group, *args, **kwargs):
+        super(EducationGroupRosterForm, self).__init__(*args, **kwargs)
+        self.group = group
+        self.fields['students'].widget.attrs['class'] = 'no-widget-init'
+        if not self.is_bound:
+            self.fields['students'].initial = sorted(get_group_students(group))
+
+    def save(self):
+        return set_group_students(self.group, [student.pk for student in self.cleaned_data['students']])
+
+
 class EducationGroupSearchForm(forms.Form):
     name = forms.CharField(
         max_length=16, required=False, label='',
@@ -99,6 +142,14 @@ class TeacherForm(forms.ModelForm):
         fields = '__all__'
 
 
+class TeacherImportForm(forms.ModelForm):
+    birth_date = forms.DateField(required=True)
+
+    class Meta:
+        model = Teacher
+        fields = ('last_name', 'first_name', 'birth_date', 'active')
+
+
 class TeacherSearchForm(forms.Form):
     last_name = forms.CharField(
         max_length=16, required=False, label='',
@@ -154,6 +205,64 @@ class LectureForm(forms.ModelForm):
         self.fields['groups'].widget.attrs['class'] = 'no-widget-init'
         self.fields['groups'].required = False
 
+    def clean(self):
+        cleaned_data = super(LectureForm, self).clean()
+        start, finish = cleaned_data.get('start'), cleaned_data.get('finish')
+        if not start or not finish:
+            return cleaned_data
+        if finish <= start:
+            self.add_error('finish', _('The lecture must finish after it starts.'))
+            return cleaned_data
+        teachers = cleaned_data.get('teachers') or []
+        groups = cleaned_data.get('groups') or []
+        conflicts = find_conflicts(
+            start, finish, teachers=[t.pk for t in teachers], groups=[g.pk for g in groups],
+            exclude=self.instance.pk)
+        self.add_conflict_errors(conflicts)
+        return cleaned_data
+
+    def add_conflict_errors(self, conflicts, limit=10):
+        """
+        Report the ``Conflict``s found in ``projects.education.timetable`` on
+        the teachers and groups fields.
+        """
+        if not conflicts:
+            return
+        resources = dict(
+            [(('teachers', t.pk), t) for t in self.cleaned_data.get('teachers') or []] +
+            [(('groups', g.pk), g) for g in self.cleaned_data.get('groups') or []])
+        lectures = Lecture.objects.in_bulk(set(conflict.lecture_id for conflict in conflicts[:limit]))
+        for conflict in conflicts[:limit]:
+            lecture = lectures[conflict.lecture_id]
+            message = _('%(resource)s already has "%(lecture)s" from %(start)s to %(finish)s.')
+            self.add_error(conflict.field, message % {
+                'resource': resources[conflict.field, conflict.resource_id],
+                'lecture': lecture,
+                'start': formats.localize(timezone.template_localtime(lecture.start)),
+                'finish': formats.localize(timezone.template_localtime(lecture.finish)),
+            })
+        if len(conflicts) > limit:
+            self.add_error(None, _('%d more conflicts are not shown.') % (len(conflicts) - limit))
+
+    def save(self, commit=True):
+        """
+        Save the lecture once its teachers and groups are locked and still
+        free, raising ``ConflictError`` if a lecture saved since ``clean()``
+        took the period.
+        """
+        if not commit:
+            return super(LectureForm, self).save(commit)
+        teachers = [teacher.pk for teacher in self.cleaned_data.get('teachers') or []]
+        groups = [group.pk for group in self.cleaned_data.get('groups') or []]
+        with transaction.atomic(using=router.db_for_write(Lecture)):
+            lock_resources(teachers, groups)
+            conflicts = find_conflicts(
+                self.cleaned_data['start'], self.cleaned_data['finish'], teachers=teachers, groups=groups,
+                exclude=self.instance.pk)
+            if conflicts:
+                raise ConflictError(conflicts)
+            return super(LectureForm, self).save(commit)
+
     class Meta:
         model = Lecture
         fields = '__all__'
@@ -163,6 +272,74 @@ class LectureForm(forms.ModelForm):
         }
 
 
+class LectureSeriesForm(LectureForm):
+    """
+    Create a lecture on the chosen weekdays of every *interval*-th week
+    between two dates, skipping the exception dates.
+    """
+    max_occurrences = 500
+
+    first_date = forms.DateField(
+        label=_('From'), widget=DatePickerInput(attrs={'type': 'date', 'class': 'form-control'}))
+    last_date = forms.DateField(
+        label=_('Until'), widget=DatePickerInput(attrs={'type': 'date', 'class': 'form-control'}))
+    start_time = forms.TimeField(label=_('Start'), widget=TimePickerInput())
+    finish_time = forms.TimeField(label=_('finish'), widget=TimePickerInput())
+    weekdays = forms.TypedMultipleChoiceField(
+        label=_('Weekdays'), choices=sorted(WEEKDAYS.items()), coerce=int,
+        widget=forms.CheckboxSelectMultiple)
+    interval = forms.IntegerField(
+        label=_('Every how many weeks'), initial=1, min_value=1, max_value=52)
+    exceptions = forms.CharField(
+        label=_('Except on'), required=False, widget=forms.Textarea(attrs={'rows': 3}),
+        help_text=_('Dates without a lecture, separated by spaces or new lines.'))
+
+    def clean_exceptions(self):
+        field = forms.DateField()
+        return set(field.clean(value) for value in self.cleaned_data['exceptions'].replace(',', ' ').split())
+
+    def clean(self):
+        cleaned_data = super(LectureSeriesForm, self).clean()
+        if self.errors:
+            return cleaned_data
+        if cleaned_data['finish_time'] <= cleaned_data['start_time']:
+            self.add_error('finish_time', _('The lecture must finish after it starts.'))
+            return cleaned_data
+        if cleaned_data['last_date'] < cleaned_data['first_date']:
+            self.add_error('last_date', _('The series must end after it begins.'))
+            return cleaned_data
+        dates = list(occurrences(
+            cleaned_data['first_date'], cleaned_data['last_date'], cleaned_data['weekdays'],
+            cleaned_data['interval'], cleaned_data['exceptions']))
+        if not dates:
+            raise forms.ValidationError(_('The series has no lectures.'))
+        if len(dates) > self.max_occurrences:
+            raise forms.ValidationError(
+                _('A series can have at most %d lectures.') % self.max_occurrences)
+        self.periods = occurrence_periods(dates, cleaned_data['start_time'], cleaned_data['finish_time'])
+        teachers = cleaned_data.get('teachers') or []
+        groups = cleaned_data.get('groups') or []
+        # Occurrences are on distinct days, they can only conflict with
+        # saved lectures.
+        conflicts = find_batch_conflicts(
+            ('occurrence-%d' % index, start, finish, [t.pk for t in teachers], [g.pk for g in groups])
+            for index, (start, finish) in enumerate(self.periods))
+        self.add_conflict_errors([conflict for key, conflict in conflicts])
+        return cleaned_data
+
+    def save(self, commit=True):
+        return create_series(
+            self.periods,
+            teachers=[teacher.pk for teacher in self.cleaned_data['teachers']],
+            groups=[group.pk for group in self.cleaned_data.get('groups') or []],
+            title=self.cleaned_data['title'],
+            description=self.cleaned_data['description'],
+            course=self.cleaned_data['course'])
+
+    class Meta(LectureForm.Meta):
+        fields = ('title', 'description', 'course', 'teachers', 'groups')
+
+
 class LectureSearchForm(forms.Form):
     title = forms.CharField(
         max_length=16, required=False, label='',
@@ -173,3 +350,58 @@ class LectureSearchForm(forms.Form):
         cleaned_data = super(LectureSearchForm, self).clean()
         cleaned_data['title'] = cleaned_data['title'].strip()
         return cleaned_data
+
+
+class ImportForm(forms.Form):
+    KIND_CHOICES = (
+        ('students', _('Students')),
+        ('teachers', _('Teachers')),
+        ('groups', _('Education Groups')),
+    )
+    kind = forms.ChoiceField(label=_('Import'), choices=KIND_CHOICES)
+    file = forms.FileField(
+        label=_('CSV file'),
+        help_text=_('UTF-8 with a header row. Education groups of a student are separated by ";".'))
+
+
+class ISODateTimeField(forms.DateTimeField):
+    """
+    ``DateTimeField`` reading ISO 8601 dates and date times with or without
+    an offset, as sent by calendar widgets.
+    """
+    input_formats = ['iso-8601']
+
+    def strptime(self, value, format):
+        result = parse_datetime(value)
+        if result is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError('Not an ISO 8601 date: %r' % value)
+            result = datetime.datetime.combine(day, datetime.time())
+        if timezone.is_aware(result):
+            result = timezone.make_naive(result)
+        return result
+
+
+class LectureCalendarForm(forms.Form):
+    """
+    Query of the lecture calendar: the lectures overlapping ``[start, end)``,
+    optionally of one course, teacher or group.
+    """
+    max_days = 62
+
+    start = ISODateTimeField()
+    end = ISODateTimeField()
+    course = forms.IntegerField(required=False, min_value=1)
+    teacher = forms.IntegerField(required=False, min_value=1)
+    group = forms.IntegerField(required=False, min_value=1)
+
+    def clean(self):
+        cleaned_data = super(LectureCalendarForm, self).clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end:
+            if end <= start:
+                raise forms.ValidationError(_('The end must be after the start.'))
+            if (end - start).days > self.max_days:
+                raise forms.ValidationError(_('At most %d days can be shown at once.') % self.max_days)
+        return cleaned_data
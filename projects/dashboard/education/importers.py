@@ -0,0 +1,194 @@
+import csv
+
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.utils.translation import ugettext as _
+from projects.dashboard.group_counts import reconcile
+from projects.dashboard.stats import record_created, untracked
+from projects.dashboard.versions import touch
+from projects.education.models import Student, EducationGroup, Teacher
+
+from .forms import EducationGroupForm, StudentImportForm, TeacherImportForm
+
+User = get_user_model()
+
+
+class BaseImporter(object):
+    """
+    Import model rows from a CSV stream in batches of *batch_size* rows.
+
+    Rows are validated with *form_class*, relations are resolved with one
+    query per batch, and each batch is written with ``bulk_create`` inside its
+    own transaction, so memory use does not grow with the input; run it in
+    a transaction to import all or nothing. Invalid rows are skipped and
+    reported in ``errors`` as ``(line, message)`` pairs. A stream which is
+    not valid CSV raises ``csv.Error``.
+    """
+    model = None
+    form_class = None
+    batch_size = 1000
+    max_errors = 100
+    defaults = {}
+
+    def __init__(self, batch_size=None, progress=None):
+        self.batch_size = batch_size or self.batch_size
+        self.progress = progress
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, stream):
+        reader = csv.DictReader(stream, strict=True)
+        batch = []
+        for row in reader:
+            batch.append((reader.line_num, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+    def clean_row(self, row):
+        data = dict(self.defaults)
+        data.update((key.strip(), (value or '').strip()) for key, value in row.items() if key)
+        return data
+
+    def import_batch(self, batch):
+        rows = []
+        for line, row in batch:
+            data = self.clean_row(row)
+            form = self.form_class(data)
+            if not form.is_valid():
+                self.add_error(line, '; '.join(
+                    '%s: %s' % (field, ' '.join(errors)) for field, errors in form.errors.items()))
+                continue
+            rows.append((line, data, form.instance))
+        rows = self.resolve(rows)
+        if rows:
+            with transaction.atomic(using=router.db_for_write(self.model)):
+                with untracked():
+                    self.save(rows)
+                record_created(self.model, [instance.pk for line, data, instance in rows])
+            self.imported += len(rows)
+            touch(*self.get_touched_models())
+        if self.progress is not None:
+            self.progress(self)
+
+    def resolve(self, rows):
+        """
+        Resolve the relations of a batch of valid ``(line, data, instance)``
+        rows, returning the rows that can be saved.
+        """
+        return rows
+
+    def save(self, rows):
+        objs = [instance for line, data, instance in rows]
+        connection = connections[router.db_for_write(self.model)]
+        if connection.features.can_return_ids_from_bulk_insert:
+            self.model._default_manager.bulk_create(objs)
+        else:
+            # The related rows below need the primary keys.
+            for obj in objs:
+                obj.save(force_insert=True)
+
+    def get_touched_models(self):
+        return [self.model]
+
+
+class UserMixin(object):
+    """
+    Link imported rows to the user named in the *username* column.
+    """
+
+    def resolve(self, rows):
+        rows = super(UserMixin, self).resolve(rows)
+        usernames = set(data['username'] for line, data, instance in rows if data.get('username'))
+        users = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+        resolved = []
+        for line, data, instance in rows:
+            username = data.get('username')
+            if username and username not in users:
+                self.add_error(line, _('Unknown user: %s') % username)
+                continue
+            instance.user_id = users.get(username)
+            resolved.append((line, data, instance))
+        return resolved
+
+
+class StudentImporter(UserMixin, BaseImporter):
+    """
+    Columns: last_name, first_name, birth_date, active, username and groups,
+    the names of the student's education groups separated by ``;``.
+    """
+    model = Student
+    form_class = StudentImportForm
+    defaults = {'active': 'true'}
+
+    def __init__(self, *args, **kwargs):
+        super(StudentImporter, self).__init__(*args, **kwargs)
+        # Group names resolved so far, bounded by the number of groups.
+        self.groups = {}
+
+    def resolve(self, rows):
+        rows = super(StudentImporter, self).resolve(rows)
+        names = set()
+        for line, data, instance in rows:
+            instance.group_names = [name.strip() for name in data.get('groups', '').split(';') if name.strip()]
+            names.update(instance.group_names)
+        missing = names.difference(self.groups)
+        if missing:
+            for name, pk in EducationGroup.objects.filter(name__in=missing).order_by('-pk').values_list('name', 'pk'):
+                self.groups[name] = pk
+        resolved = []
+        for line, data, instance in rows:
+            unknown = [name for name in instance.group_names if name not in self.groups]
+            if unknown:
+                self.add_error(line, _('Unknown education groups: %s') % ', '.join(unknown))
+                continue
+            resolved.append((line, data, instance))
+        return resolved
+
+    def save(self, rows):
+        super(StudentImporter, self).save(rows)
+        through = Student.education_groups.through
+        links = [
+            through(student_id=instance.pk, educationgroup_id=self.groups[name])
+            for line, data, instance in rows for name in set(instance.group_names)
+        ]
+        through.objects.bulk_create(links)
+        # The links were inserted without m2m_changed.
+        reconcile(set(link.educationgroup_id for link in links))
+
+    def get_touched_models(self):
+        return [Student, Student.education_groups.through]
+
+
+class TeacherImporter(UserMixin, BaseImporter):
+    """
+    Columns: last_name, first_name, birth_date, active and username.
+    """
+    model = Teacher
+    form_class = TeacherImportForm
+    defaults = {'active': 'true'}
+
+
+class EducationGroupImporter(BaseImporter):
+    """
+    Columns: name, description and active.
+    """
+    model = EducationGroup
+    form_class = EducationGroupForm
+    defaults = {'active': 'true'}
+
+
+IMPORTERS = {
+    'students': StudentImporter,
+    'teachers': TeacherImporter,
+    'groups': EducationGroupImporter,
+}
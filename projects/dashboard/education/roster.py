@@ -0,0 +1,48 @@
+from django.db import IntegrityError, router, transaction
+from projects.dashboard.group_counts import reconcile
+from projects.dashboard.stats import bulk_tracked
+from projects.dashboard.versions import touch
+from projects.education.models import EducationGroup, Student
+
+
+def get_group_students(group):
+    """
+    Return the pks of the students of *group*.
+    """
+    through = Student.education_groups.through
+    return set(through.objects.filter(educationgroup_id=group.pk).values_list('student_id', flat=True))
+
+
+def set_group_students(group, student_pks, attempts=3):
+    """
+    Make the students with *student_pks* the members of *group*, applying
+    the difference to the current links with one bulk insert and one
+    ``DELETE``, without ``m2m_changed``. Returns the pks added and removed.
+    """
+    through = Student.education_groups.through
+    using = router.db_for_write(through)
+    wanted = set(student_pks)
+    with transaction.atomic(using=using):
+        # Roster changes of the same group wait for each other.
+        EducationGroup.objects.select_for_update().filter(pk=group.pk).exists()
+        for attempt in range(attempts):
+            current = get_group_students(group)
+            added, removed = wanted - current, current - wanted
+            if not added and not removed:
+                return added, removed
+            try:
+                with transaction.atomic(using=using), bulk_tracked(Student.objects.filter(pk__in=added | removed)):
+                    through.objects.bulk_create([
+                        through(student_id=pk, educationgroup_id=group.pk) for pk in sorted(added)])
+                    if removed:
+                        # QuerySet.delete() would collect the rows to send signals.
+                        through.objects.filter(educationgroup_id=group.pk, student_id__in=removed)._raw_delete(using)
+            except IntegrityError:
+                # A student saved meanwhile got linked to the group, diff again.
+                if attempt == attempts - 1:
+                    raise
+            else:
+                break
+        reconcile([group.pk])
+    touch(through)
+    return added, removed
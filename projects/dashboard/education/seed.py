@@ -0,0 +1,151 @@
+import datetime
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import router, transaction
+from django.utils import timezone
+from projects.dashboard.group_counts import reconcile
+from projects.dashboard.stats import recompute, untracked
+from projects.dashboard.versions import touch
+from projects.education.models import Course, EducationGroup, Lecture, Student, Teacher
+
+User = get_user_model()
+
+SYLLABLES = (
+    'an', 'bo', 'da', 'el', 'fi', 'ga', 'in', 'ka', 'le', 'mi', 'no', 'ov', 'pa', 'ra', 'se', 'ta', 'ul',
+    'va', 'ze', 'chu', 'kov', 'lin', 'mar', 'nik', 'ros', 'sha', 'tor', 'vich', 'yan', 'zin',
+)
+SUBJECTS = (
+    'Algebra', 'Biology', 'Chemistry', 'Drawing', 'Economics', 'Geography', 'Geometry', 'History',
+    'Informatics', 'Literature', 'Music', 'Physics', 'Psychology', 'Rhetoric', 'Statistics',
+)
+
+# Lectures start at one of these hours on weekdays and last 90 minutes.
+LECTURE_HOURS = (8, 10, 12, 14, 16, 18)
+LECTURE_DURATION = datetime.timedelta(minutes=90)
+
+
+class Seeder(object):
+    """
+    Fill the education tables with *counts* of synthetic objects, keyed by
+    model name, for benchmarking. Rows are written with ``bulk_create()``
+    in transactions of *batch_size* objects; the group counts and the
+    dashboard statistics are rebuilt once at the end. A *user_share* of the
+    students and teachers get one of the users created. *seed* makes the
+    data reproducible.
+    """
+    batch_size = 5000
+
+    def __init__(self, counts, groups_per_student=2, teachers_per_lecture=1, groups_per_lecture=3,
+                 user_share=0.5, batch_size=None, seed=0, progress=None):
+        self.counts = counts
+        self.groups_per_student = groups_per_student
+        self.teachers_per_lecture = teachers_per_lecture
+        self.groups_per_lecture = groups_per_lecture
+        self.user_share = user_share
+        self.batch_size = batch_size or self.batch_size
+        self.random = random.Random(seed)
+        self.progress = progress
+        self.created = {}
+
+    def run(self):
+        with untracked():
+            # Usernames are unique, number them on from the earlier runs.
+            self.user_offset = User.objects.count()
+            self.password = make_password(None)
+            self.user_pks = self.seed(User, self.make_user)
+            group_pks = self.seed(EducationGroup, self.make_group)
+            teacher_pks = self.seed(Teacher, self.make_teacher)
+            course_pks = self.seed(Course, self.make_course)
+            self.seed(Student, self.make_student, [('education_groups', group_pks, self.groups_per_student)])
+            if course_pks:
+                self.course_pks = course_pks
+                self.seed(Lecture, self.make_lecture, [
+                    ('teachers', teacher_pks, self.teachers_per_lecture),
+                    ('groups', group_pks, self.groups_per_lecture),
+                ])
+        reconcile()
+        recompute()
+        return self
+
+    def name(self, syllables=(2, 4)):
+        return ''.join(self.random.choice(SYLLABLES) for i in range(self.random.randint(*syllables))).capitalize()
+
+    def birth_date(self, first_year, last_year):
+        return datetime.date(first_year, 1, 1) + datetime.timedelta(
+            days=self.random.randint(0, (last_year - first_year) * 365))
+
+    def make_user(self, index):
+        return User(
+            username='seed-%s-%d' % (self.name((1, 2)).lower(), self.user_offset + index), password=self.password,
+            first_name=self.name((1, 3)), last_name=self.name())
+
+    def user_id(self):
+        if self.user_pks and self.random.random() < self.user_share:
+            return self.random.choice(self.user_pks)
+        return None
+
+    def make_group(self, index):
+        return EducationGroup(name='%s-%d' % (self.name((1, 2)).upper(), index))
+
+    def make_teacher(self, index):
+        return Teacher(
+            last_name=self.name(), first_name=self.name((1, 3)), birth_date=self.birth_date(1950, 1995),
+            user_id=self.user_id())
+
+    def make_course(self, index):
+        return Course(title='%s %s %d' % (self.random.choice(SUBJECTS), self.name((1, 2)), index))
+
+    def make_student(self, index):
+        return Student(
+            last_name=self.name(), first_name=self.name((1, 3)), birth_date=self.birth_date(1995, 2012),
+            active=self.random.random() < 0.9, user_id=self.user_id())
+
+    def make_lecture(self, index):
+        day = timezone.localdate() + datetime.timedelta(days=self.random.randint(-182, 182))
+        while day.weekday() > 4:
+            day += datetime.timedelta(days=1)
+        start = timezone.make_aware(datetime.datetime.combine(
+            day, datetime.time(self.random.choice(LECTURE_HOURS))))
+        return Lecture(
+            title='%s %d' % (self.name(), index), course_id=self.random.choice(self.course_pks),
+            start=start, finish=start + LECTURE_DURATION)
+
+    def seed(self, model, make, relations=()):
+        """
+        Create ``counts[model_name]`` objects built by *make* and link each
+        to a random sample of the pks of every ``(field, pks, per_object)``
+        in *relations*. Returns the pks created.
+        """
+        total = self.counts.get(model._meta.model_name, 0)
+        created = []
+        for offset in range(0, total, self.batch_size):
+            objs = [make(index) for index in range(offset, min(offset + self.batch_size, total))]
+            with transaction.atomic(using=router.db_for_write(model)):
+                last_pk = model._default_manager.order_by('-pk').values_list('pk', flat=True).first() or 0
+                model._default_manager.bulk_create(objs)
+                if objs[0].pk is None:
+                    # No RETURNING on this database, nothing else writes
+                    # to a database being seeded.
+                    pks = list(model._default_manager.filter(pk__gt=last_pk).order_by('pk').values_list(
+                        'pk', flat=True))
+                else:
+                    pks = [obj.pk for obj in objs]
+                for field, targets, per_object in relations:
+                    self.link(model, field, pks, targets, per_object)
+            created.extend(pks)
+            if self.progress is not None:
+                self.progress(model, len(created), total)
+        touch(model, *[model._meta.get_field(field).remote_field.through for field, targets, n in relations])
+        self.created[model._meta.model_name] = len(created)
+        return created
+
+    def link(self, model, field, pks, targets, per_object):
+        field = model._meta.get_field(field)
+        through = field.remote_field.through
+        source, target = field.m2m_field_name() + '_id', field.m2m_reverse_field_name() + '_id'
+        per_object = min(per_object, len(targets))
+        through.objects.bulk_create([
+            through(**{source: pk, target: target_pk})
+            for pk in pks for target_pk in self.random.sample(targets, per_object)])
@@ -0,0 +1,93 @@
+import datetime
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+from projects.dashboard.group_counts import reconcile
+from projects.dashboard.stats import record_created, untracked
+from projects.dashboard.versions import touch
+from projects.education.models import Lecture
+from projects.education.timetable import (
+    RESOURCE_FIELDS, ConflictError, find_batch_conflicts, get_through, lock_resources)
+
+
+def occurrences(first_date, last_date, weekdays, interval=1, exceptions=()):
+    """
+    Yield the dates from *first_date* to *last_date* inclusive falling on one
+    of *weekdays* (0 is Monday) of every *interval*-th week, counted from the
+    week of *first_date*, leaving out *exceptions*.
+    """
+    weekdays = set(int(weekday) for weekday in weekdays)
+    exceptions = set(exceptions)
+    week_start = first_date - datetime.timedelta(days=first_date.weekday())
+    day = first_date
+    while day <= last_date:
+        if (day.weekday() in weekdays and ((day - week_start).days // 7) % interval == 0 and
+                day not in exceptions):
+            yield day
+        day += datetime.timedelta(days=1)
+
+
+def localize(value, tz):
+    """
+    Make the naive *value* aware in *tz*. A wall clock time skipped by a DST
+    change moves forward by the gap, a repeated one is taken after the
+    change, where ``timezone.make_aware()`` would raise.
+    """
+    value = timezone.make_aware(value, tz, is_dst=False)
+    return tz.normalize(value) if hasattr(tz, 'normalize') else value
+
+
+def occurrence_periods(dates, start_time, finish_time, tz=None):
+    """
+    Return the aware ``(start, finish)`` periods of *dates* at the given wall
+    clock times, so a weekly lecture stays at 10:00 across DST changes. The
+    lectures keep their length on the nights of the changes.
+    """
+    tz = tz or timezone.get_current_timezone()
+    duration = datetime.datetime.combine(datetime.date.min, finish_time) - datetime.datetime.combine(
+        datetime.date.min, start_time)
+    periods = []
+    for day in dates:
+        start = localize(datetime.datetime.combine(day, start_time), tz)
+        periods.append((start, start + duration))
+    return periods
+
+
+def create_series(periods, teachers=(), groups=(), **fields):
+    """
+    Create one ``Lecture`` with *fields* per ``(start, finish)`` in *periods*
+    and link them to the *teachers* and *groups* pks, in one transaction
+    with a bulk insert for the lectures and one per relation. Raises
+    ``ConflictError`` when, with the teachers and groups locked, one of the
+    periods turns out to be taken.
+    """
+    lectures = [Lecture(start=start, finish=finish, **fields) for start, finish in periods]
+    if not lectures:
+        return lectures
+    using = router.db_for_write(Lecture)
+    touched = [Lecture]
+    with transaction.atomic(using=using):
+        # The form checked before, a lecture saved since would be missed.
+        lock_resources(teachers, groups)
+        conflicts = find_batch_conflicts(
+            ('occurrence-%d' % index, start, finish, teachers, groups)
+            for index, (start, finish) in enumerate(periods))
+        if conflicts:
+            raise ConflictError([conflict for key, conflict in conflicts])
+        with untracked():
+            if connections[using].features.can_return_ids_from_bulk_insert:
+                Lecture.objects.bulk_create(lectures)
+            else:
+                # The links below need the primary keys.
+                for lecture in lectures:
+                    lecture.save(force_insert=True)
+            for field, pks in zip(RESOURCE_FIELDS, (teachers, groups)):
+                through, lecture_name, resource_name = get_through(field)
+                through.objects.bulk_create([
+                    through(**{lecture_name + '_id': lecture.pk, resource_name + '_id': pk})
+                    for lecture in lectures for pk in pks])
+                touched.append(through)
+        record_created(Lecture, [lecture.pk for lecture in lectures])
+        reconcile(groups)
+    touch(*touched)
+    return lectures
@@ -1,15 +1,13 @@
 from django.utils.translation import ungettext_lazy
-from django_tables2 import A, LinkColumn, TemplateColumn
+from django_tables2 import A
 from projects.education.models import (
     Student, EducationGroup, Teacher, Course, Lecture)
-from projects.dashboard.tables import DashboardTable
+from projects.dashboard.tables import ActionsColumn, CachedLinkColumn, DashboardTable
 
 
 class StudentTable(DashboardTable):
-    last_name = LinkColumn('dashboard:education-student-update', args=[A('pk')])
-    actions = TemplateColumn(
-        template_name='dashboard/education/student/row_actions.html',
-        orderable=False)
+    last_name = CachedLinkColumn('dashboard:education-student-update', args=[A('pk')])
+    actions = ActionsColumn('dashboard/education/student/row_actions.html')
 
     icon = 'sitemap'
     caption = ungettext_lazy('%s Student', '%s Students')
@@ -21,25 +19,21 @@ class StudentTable(DashboardTable):
 
 
 class EducationGroupTable(DashboardTable):
-    name = LinkColumn('dashboard:education-group-update', args=[A('pk')])
-    actions = TemplateColumn(
-        template_name='dashboard/education/group/row_actions.html',
-        orderable=False)
+    name = CachedLinkColumn('dashboard:education-group-update', args=[A('pk')])
+    actions = ActionsColumn('dashboard/education/group/row_actions.html')
 
     icon = 'sitemap'
     caption = ungettext_lazy('%s Group', '%s Groups')
 
     class Meta(DashboardTable.Meta):
         model = EducationGroup
-        fields = ('name', 'active')
+        fields = ('name', 'student_count', 'lecture_count', 'active')
         order_by = 'name'
 
 
 class TeacherTable(DashboardTable):
-    last_name = LinkColumn('dashboard:education-teacher-update', args=[A('pk')])
-    actions = TemplateColumn(
-        template_name='dashboard/education/teacher/row_actions.html',
-        orderable=False)
+    last_name = CachedLinkColumn('dashboard:education-teacher-update', args=[A('pk')])
+    actions = ActionsColumn('dashboard/education/teacher/row_actions.html')
 
     icon = 'sitemap'
     caption = ungettext_lazy('%s Teacher', '%s Teachers')
@@ -51,10 +45,8 @@ class TeacherTable(DashboardTable):
 
 
 class CourseTable(DashboardTable):
-    title = LinkColumn('dashboard:education-course-update', args=[A('pk')])
-    actions = TemplateColumn(
-        template_name='dashboard/education/course/row_actions.html',
-        orderable=False)
+    title = CachedLinkColumn('dashboard:education-course-update', args=[A('pk')])
+    actions = ActionsColumn('dashboard/education/course/row_actions.html')
 
     icon = 'sitemap'
     caption = ungettext_lazy('%s Course', '%s Courses')
@@ -66,10 +58,8 @@ class CourseTable(DashboardTable):
 
 
 class LectureTable(DashboardTable):
-    title = LinkColumn('dashboard:education-lecture-update', args=[A('pk')])
-    actions = TemplateColumn(
-        template_name='dashboard/education/lecture/row_actions.html',
-        orderable=False)
+    title = CachedLinkColumn('dashboard:education-lecture-update', args=[A('pk')])
+    actions = ActionsColumn('dashboard/education/lecture/row_actions.html')
 
     icon = 'sitemap'
     caption = ungettext_lazy('%s Lecture', '%s Lectures')
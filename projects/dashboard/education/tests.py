@@ -1,3 +1,359 @@
-from django.test import TestCase  # NOQA
+import csv
+import datetime
+import io
+import re
+import zipfile
 
-# Create your tests here.
+import pytz
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import IntegerField, Value
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django_tables2 import RequestConfig
+from projects.dashboard.benchmarks import Benchmark
+from projects.education.models import Course, EducationGroup, Lecture, Student, Teacher
+from projects.education.timetable import ConflictError
+
+from .bulk import AssignGroupAction
+from .roster import get_group_students, set_group_students
+from .seed import Seeder
+from .series import create_series, localize, occurrence_periods, occurrences
+from .tables import CourseTable, EducationGroupTable, LectureTable, StudentTable, TeacherTable
+
+User = get_user_model()
+
+SMALL = {'user': 3, 'educationgroup': 3, 'teacher': 3, 'course': 3, 'student': 3, 'lecture': 3}
+LARGE = {'user': 40, 'educationgroup': 40, 'teacher': 40, 'course': 40, 'student': 60, 'lecture': 60}
+
+
+class QueryCountTests(TestCase):
+    """
+    Every dashboard education URL must run as many queries with a few rows
+    as with more rows than fit on a page, so per-row queries show up here.
+    The same goes for creating, updating and deleting an object of every
+    model through the forms.
+    """
+
+    def setUp(self):
+        # Stamps are bumped on commit and rolled back with the test, drop what was cached under them.
+        cache.clear()
+
+    def capture(self, benchmark):
+        queries = {}
+        for name, url, query in benchmark.get_urls():
+            # The first request fills the caches, the second shows the steady state.
+            benchmark.get(url, query)
+            with CaptureQueriesContext(connection) as context:
+                benchmark.get(url, query)
+            queries[name] = [executed['sql'] for executed in context.captured_queries]
+        return queries
+
+    def capture_posts(self, benchmark):
+        user = User.objects.filter(is_staff=False).order_by('pk').values_list('pk', flat=True).first()
+        groups = list(EducationGroup.objects.order_by('pk').values_list('pk', flat=True)[:2])
+        teachers = list(Teacher.objects.order_by('pk').values_list('pk', flat=True)[:1])
+        course = Course.objects.order_by('pk').values_list('pk', flat=True).first()
+        forms = (
+            ('student', Student, {
+                'last_name': 'Posted', 'first_name': 'Student', 'birth_date': '2000-01-01', 'active': 'on',
+                'user': user, 'education_groups': groups}),
+            ('group', EducationGroup, {'name': 'POSTED', 'description': '', 'active': 'on'}),
+            ('teacher', Teacher, {
+                'last_name': 'Posted', 'first_name': 'Teacher', 'birth_date': '1970-01-01', 'active': 'on',
+                'user': user}),
+            ('course', Course, {'title': 'Posted', 'description': '', 'active': 'on'}),
+            # Far from the seeded lectures, so that no conflict is reported.
+            ('lecture', Lecture, {
+                'title': 'Posted', 'description': '', 'course': course, 'start': '2100-01-04 10:00:00',
+                'finish': '2100-01-04 11:30:00', 'teachers': teachers, 'groups': groups}),
+        )
+        queries = {}
+        for name, model, data in forms:
+            url = 'dashboard:education-%s-' % name
+            queries[name + ' create'] = self.post(benchmark, reverse(url + 'create'), data)
+            pk = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+            changed = dict(data)
+            for key in ('education_groups', 'groups'):
+                # Unlinking the first group goes through the many-to-many diff.
+                if key in changed:
+                    changed[key] = changed[key][1:]
+            queries[name + ' update'] = self.post(benchmark, reverse(url + 'update', kwargs={'pk': pk}), changed)
+            queries[name + ' delete'] = self.post(benchmark, reverse(url + 'delete', kwargs={'pk': pk}), {})
+            self.assertFalse(model.objects.filter(pk=pk).exists())
+        return queries
+
+    def post(self, benchmark, url, data):
+        with CaptureQueriesContext(connection) as context:
+            response = benchmark.client.post(url, data)
+        form = response.context and response.context.get('form')
+        self.assertEqual(response.status_code, 302, form and form.errors)
+        return [executed['sql'] for executed in context.captured_queries]
+
+    def assertSameCounts(self, small, large):
+        self.assertEqual(sorted(small), sorted(large))
+        for name in sorted(large):
+            with self.subTest(name=name):
+                self.assertEqual(len(small[name]), len(large[name]), '%d queries with few rows, %d with more:\n%s' % (
+                    len(small[name]), len(large[name]), '\n'.join(large[name])))
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        Seeder(SMALL, seed=1).run()
+        benchmark = Benchmark()
+        small = self.capture(benchmark)
+        Seeder(dict((name, count - SMALL[name]) for name, count in LARGE.items()), seed=2).run()
+        # Rows with a user are what shows the joins of it missing.
+        self.assertTrue(Student.objects.filter(user__isnull=False).exists())
+        self.assertTrue(Teacher.objects.filter(user__isnull=False).exists())
+        large = self.capture(benchmark)
+        self.assertIn('education-student-list', large)
+        self.assertIn('education-user-autocomplete', large)
+        self.assertSameCounts(small, large)
+
+    def test_post_query_counts_do_not_grow_with_rows(self):
+        Seeder(SMALL, seed=1).run()
+        benchmark = Benchmark()
+        small = self.capture_posts(benchmark)
+        Seeder(dict((name, count - SMALL[name]) for name, count in LARGE.items()), seed=2).run()
+        large = self.capture_posts(benchmark)
+        self.assertIn('lecture delete', large)
+        self.assertSameCounts(small, large)
+
+
+class RenderRowsTests(TestCase):
+    """
+    ``DashboardTable.render_rows()`` must write the markup of the table
+    template, up to whitespace.
+    """
+    tables = (StudentTable, EducationGroupTable, TeacherTable, CourseTable, LectureTable)
+
+    def normalize(self, html):
+        return re.sub(r'\s+', ' ', re.sub(r'>\s+<', '><', html)).strip()
+
+    def test_rows_match_template(self):
+        Seeder(SMALL, seed=1).run()
+        benchmark = Benchmark()
+        request = RequestFactory().get('/')
+        request.user = benchmark.user
+        for table_class in self.tables:
+            with self.subTest(table=table_class.__name__):
+                records = list(table_class._meta.model._default_manager.all())
+                self.assertTrue(records)
+                table = table_class(records)
+                RequestConfig(request, paginate={'per_page': benchmark.table_rows}).configure(table)
+                self.assertIsNotNone(table.render_rows())
+                self.assertEqual(
+                    self.normalize(benchmark.render_table(table_class, records, True)),
+                    self.normalize(benchmark.render_table(table_class, records, False)))
+
+
+class RacingAssignGroupAction(AssignGroupAction):
+    """
+    Misses the links a concurrent request added, on the first attempt.
+    """
+    raced = False
+
+    def get_missing(self, queryset, group):
+        if self.raced:
+            return super(RacingAssignGroupAction, self).get_missing(queryset, group)
+        self.raced = True
+        return queryset.order_by().annotate(
+            bulk_group=Value(group.pk, output_field=IntegerField())).values_list('pk', 'bulk_group')
+
+
+class AssignGroupActionTests(TestCase):
+
+    def setUp(self):
+        self.group = EducationGroup.objects.create(name='A1')
+        self.students = [
+            Student.objects.create(
+                last_name='Student %d' % index, first_name='Ada', birth_date=datetime.date(2000, 1, 1))
+            for index in range(3)]
+        self.students[0].education_groups.add(self.group)
+
+    def test_links_missing_rows(self):
+        count = AssignGroupAction('education_groups').run(Student.objects.all(), {'group': self.group})
+        self.assertEqual(count, 2)
+        self.assertEqual(set(self.group.student_set.all()), set(self.students))
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.student_count, 3)
+
+    def test_links_added_concurrently_are_skipped(self):
+        count = RacingAssignGroupAction('education_groups').run(Student.objects.all(), {'group': self.group})
+        self.assertEqual(count, 2)
+        self.assertEqual(Student.education_groups.through.objects.filter(educationgroup=self.group).count(), 3)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.student_count, 3)
+
+
+class ImportViewTests(TestCase):
+    """
+    An upload is imported whole or, when it is not readable, not at all.
+    """
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+
+    def post(self, content):
+        return self.client.post(reverse('dashboard:education-import'), {
+            'kind': 'groups', 'file': SimpleUploadedFile('groups.csv', content, content_type='text/csv')})
+
+    def rows(self, count):
+        return ''.join('Group %d,,true\n' % index for index in range(count)).encode('utf-8')
+
+    def test_import(self):
+        response = self.post(b'name,description,active\n' + self.rows(3) + b',,true\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['importer'].imported, 3)
+        self.assertEqual(response.context['importer'].errors, [(5, 'name: This field is required.')])
+        self.assertEqual(EducationGroup.objects.count(), 3)
+
+    def test_not_utf8(self):
+        # The bad bytes come after a whole batch.
+        response = self.post(b'name,description,active\n' + self.rows(1500) + 'Gruppe \xe4,,true\n'.encode('latin-1'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response, 'form', 'file', 'The file is not UTF-8 encoded.')
+        self.assertFalse(EducationGroup.objects.exists())
+
+    def test_not_csv(self):
+        response = self.post(b'name,description,active\n' + self.rows(1500) + b'"Group"x,,true\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('The file is not valid CSV', response.context['form'].errors['file'][0])
+        self.assertFalse(EducationGroup.objects.exists())
+
+
+class ETagTests(TransactionTestCase):
+    """
+    List pages answer 304 until a write to their tables commits.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('staff', is_staff=True)
+        self.client.force_login(self.user)
+        Course.objects.create(title='Algebra')
+        self.url = reverse('dashboard:education-course-list')
+
+    def test_not_modified_until_a_write(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Course.objects.create(title='Geometry')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Geometry')
+
+    def test_etags_differ_per_user_and_url(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(self.url, {'title': 'Alg'})['ETag'], etag)
+        self.client.force_login(User.objects.create_user('other', is_staff=True))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        for title in ('Geometry', 'Algebra', 'Crème brûlée'):
+            Course.objects.create(title=title)
+        self.url = reverse('dashboard:education-course-list')
+
+    def export(self, export_format):
+        response = self.client.get(self.url, {'_export': export_format, 'sort': 'title'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Disposition'], 'attachment; filename="course.%s"' % export_format)
+        return b''.join(response.streaming_content)
+
+    def test_csv(self):
+        content = self.export('csv').decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        rows = list(csv.reader(io.StringIO(content[1:])))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([row[0] for row in rows[1:]], ['Algebra', 'Crème brûlée', 'Geometry'])
+        self.assertTrue(all(len(row) == len(rows[0]) for row in rows))
+
+    def test_xlsx(self):
+        archive = zipfile.ZipFile(io.BytesIO(self.export('xlsx')))
+        self.assertIsNone(archive.testzip())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(sheet.count('<row>'), 4)
+        self.assertLess(sheet.index('Algebra'), sheet.index('Crème brûlée'))
+        self.assertLess(sheet.index('Crème brûlée'), sheet.index('Geometry'))
+
+
+class SeriesTests(TestCase):
+    """
+    Weekly lectures stay at their wall clock time across DST changes.
+    """
+    tz = pytz.timezone('Europe/Berlin')
+    dates = [datetime.date(2018, 3, 22), datetime.date(2018, 3, 29)]
+
+    def test_occurrences(self):
+        self.assertEqual(list(occurrences(
+            datetime.date(2018, 3, 1), datetime.date(2018, 3, 31), ['0', '3'], interval=2,
+            exceptions=[datetime.date(2018, 3, 15)])), [
+                datetime.date(2018, 3, 1), datetime.date(2018, 3, 12), datetime.date(2018, 3, 26),
+                datetime.date(2018, 3, 29)])
+
+    def test_periods_keep_the_wall_clock_time(self):
+        periods = occurrence_periods(self.dates, datetime.time(10), datetime.time(11, 30), self.tz)
+        for start, finish in periods:
+            self.assertEqual(start.astimezone(self.tz).time(), datetime.time(10))
+            self.assertEqual(finish - start, datetime.timedelta(minutes=90))
+        self.assertEqual([start.astimezone(pytz.utc).hour for start, finish in periods], [9, 8])
+
+    def test_skipped_and_repeated_times(self):
+        skipped = localize(datetime.datetime(2018, 3, 25, 2, 30), self.tz)
+        self.assertEqual(skipped.astimezone(self.tz).replace(tzinfo=None), datetime.datetime(2018, 3, 25, 3, 30))
+        repeated = localize(datetime.datetime(2018, 10, 28, 2, 30), self.tz)
+        self.assertEqual(repeated.utcoffset(), datetime.timedelta(hours=1))
+        periods = occurrence_periods([datetime.date(2018, 3, 25)], datetime.time(2, 30), datetime.time(3, 30), self.tz)
+        self.assertEqual(periods[0][1] - periods[0][0], datetime.timedelta(hours=1))
+
+    def test_create_series(self):
+        course = Course.objects.create(title='Algebra')
+        teacher = Teacher.objects.create(last_name='Noether', first_name='Emmy', birth_date=datetime.date(1970, 1, 1))
+        group = EducationGroup.objects.create(name='A1')
+        periods = occurrence_periods(self.dates, datetime.time(10), datetime.time(11, 30), self.tz)
+        lectures = create_series(periods, [teacher.pk], [group.pk], title='Algebra', course=course)
+        self.assertEqual(len(lectures), 2)
+        self.assertEqual(set(teacher.lecture_set.all()), set(lectures))
+        self.assertEqual(EducationGroup.objects.get(pk=group.pk).lecture_count, 2)
+        with self.assertRaises(ConflictError) as context:
+            create_series(periods[1:], [teacher.pk], [], title='Algebra', course=course)
+        self.assertEqual(len(context.exception.conflicts), 1)
+        self.assertEqual(Lecture.objects.count(), 2)
+
+
+class RosterTests(TestCase):
+
+    def setUp(self):
+        self.group = EducationGroup.objects.create(name='A1')
+        self.students = [
+            Student.objects.create(
+                last_name='Student %d' % index, first_name='Ada', birth_date=datetime.date(2000, 1, 1))
+            for index in range(4)]
+        self.group.student_set.add(*self.students[:2])
+
+    def test_set_group_students(self):
+        added, removed = set_group_students(self.group, [self.students[1].pk, self.students[2].pk])
+        self.assertEqual((added, removed), ({self.students[2].pk}, {self.students[0].pk}))
+        self.assertEqual(get_group_students(self.group), {self.students[1].pk, self.students[2].pk})
+        self.assertEqual(EducationGroup.objects.get(pk=self.group.pk).student_count, 2)
+        self.assertEqual(set_group_students(self.group, [self.students[1].pk, self.students[2].pk]), (set(), set()))
+
+    def test_view(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        url = reverse('dashboard:education-group-students', kwargs={'pk': self.group.pk})
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.post(url, {'students': [self.students[3].pk]})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(get_group_students(self.group), {self.students[3].pk})
+        self.assertEqual(EducationGroup.objects.get(pk=self.group.pk).student_count, 1)
@@ -3,16 +3,17 @@ from django.contrib.auth.decorators import login_required
 
 from .views import (
     UserAutocomplete,
-    StudentCreateView, StudentDeleteView,
+    StudentAutocomplete, StudentCreateView, StudentDeleteView,
     StudentListView, StudentUpdateView,
     EducationGroupAutocomplete, EducationGroupCreateView, EducationGroupDeleteView,
-    EducationGroupListView, EducationGroupUpdateView,
+    EducationGroupListView, EducationGroupRosterView, EducationGroupUpdateView,
     TeacherAutocomplete, TeacherCreateView, TeacherDeleteView,
     TeacherListView, TeacherUpdateView,
     CourseAutocomplete, CourseCreateView, CourseDeleteView,
     CourseListView, CourseUpdateView,
-    LectureCreateView, LectureDeleteView,
+    LectureCalendarView, LectureCreateView, LectureDeleteView, LectureSeriesCreateView,
     LectureListView, LectureUpdateView,
+    EducationImportView,
 )
 
 
@@ -20,6 +21,9 @@ urlpatterns = [
     path(
         'users-autocomplete/', login_required(UserAutocomplete.as_view()),
         name='education-user-autocomplete'),
+    path(
+        'students-autocomplete/', login_required(StudentAutocomplete.as_view()),
+        name='education-student-autocomplete'),
     path(
         'groups-autocomplete/', login_required(EducationGroupAutocomplete.as_view()),
         name='education-group-autocomplete'),
@@ -48,6 +52,9 @@ urlpatterns = [
     path(
         'education-groups/<int:pk>/update/', login_required(EducationGroupUpdateView.as_view()),
         name='education-group-update'),
+    path(
+        'education-groups/<int:pk>/students/', login_required(EducationGroupRosterView.as_view()),
+        name='education-group-students'),
     path(
         'education-groups/<int:pk>/delete/', login_required(EducationGroupDeleteView.as_view()),
         name='education-group-delete'),
@@ -84,6 +91,12 @@ urlpatterns = [
     path(
         'lectures/create/', login_required(LectureCreateView.as_view()),
         name='education-lecture-create'),
+    path(
+        'lectures/series/create/', login_required(LectureSeriesCreateView.as_view()),
+        name='education-lecture-series-create'),
+    path(
+        'lectures/calendar/', login_required(LectureCalendarView.as_view()),
+        name='education-lecture-calendar'),
     path(
         'lectures/<int:pk>/update/', login_required(LectureUpdateView.as_view()),
         name='education-lecture-update'),
@@ -93,4 +106,8 @@ urlpatterns = [
     path(
         'lectures/', login_required(LectureListView.as_view()),
         name='education-lecture-list'),
+
+    path(
+        'import/', login_required(EducationImportView.as_view()),
+        name='education-import'),
 ]
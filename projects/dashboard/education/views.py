@@ -1,24 +1,35 @@
+import csv
+import io
+
 from dal import autocomplete
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
+from django.db import router, transaction
+from django.http import JsonResponse
 from django.utils.decorators import method_decorator
-from django.db.models import Q
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
 from django.views.generic import (
-    CreateView, DeleteView, UpdateView)
-from django_tables2 import SingleTableView
+    CreateView, DeleteView, FormView, UpdateView, View)
+from django.views.generic.detail import SingleObjectMixin
+from projects.dashboard.autocomplete import PrefixIndex, PrefixIndexAutocompleteMixin
+from projects.dashboard.pagination import FetchAheadPaginator
+from projects.dashboard.search import search, search_prefix
+from projects.dashboard.views import DashboardListView, KeysetPaginationMixin, ReplicaReadMixin, VersionETagMixin
 from projects.education.models import (
     Student, EducationGroup, Teacher, Course, Lecture)
+from projects.education.timetable import ConflictError, get_through
 
+from .bulk import AssignGroupAction
 from .forms import (
     StudentForm, StudentSearchForm,
-    EducationGroupForm, EducationGroupSearchForm,
+    EducationGroupForm, EducationGroupRosterForm, EducationGroupSearchForm,
     TeacherForm, TeacherSearchForm, CourseForm, CourseSearchForm,
-    LectureForm, LectureSearchForm,
+    LectureForm, LectureSearchForm, LectureSeriesForm, LectureCalendarForm, ImportForm,
     )
+from .importers import IMPORTERS
 from .tables import (
     StudentTable, EducationGroupTable, TeacherTable,
     CourseTable, LectureTable
@@ -27,7 +38,11 @@ from .tables import (
 User = get_user_model()
 
 
-class UserAutocomplete(autocomplete.Select2QuerySetView):
+class UserAutocomplete(ReplicaReadMixin, VersionETagMixin, autocomplete.Select2QuerySetView):
+    paginator_class = FetchAheadPaginator
+    etag_models = (User,)
+    cache_max_age = 10
+
     def get_queryset(self):
         if not self.request.user.is_authenticated:
             return User.objects.none()
@@ -38,53 +53,50 @@ class UserAutocomplete(autocomplete.Select2QuerySetView):
             qs = qs.exclude(id=user_id)
 
         if self.q:
-            qs = qs.filter(Q(name__istartswith=self.q))
-        return qs
+            return search_prefix(qs, ('username', 'first_name', 'last_name'), self.q).order_by(
+                'last_name_lower', 'first_name_lower', 'pk')
+        return qs.order_by('pk')
+
 
+class StudentAutocomplete(ReplicaReadMixin, VersionETagMixin, autocomplete.Select2QuerySetView):
+    paginator_class = FetchAheadPaginator
+    etag_models = (Student,)
+    cache_max_age = 10
 
-class EducationGroupAutocomplete(autocomplete.Select2QuerySetView):
     def get_queryset(self):
         if not self.request.user.is_authenticated:
-            return EducationGroup.objects.none()
-        education_groups = self.forwarded.get('education_groups', None)
+            return Student.objects.none()
+        qs = Student.objects.all()
+
+        students = self.forwarded.get('students', None)
+        if students:
+            qs = qs.exclude(id__in=students)
 
-        if education_groups:
-            qs = EducationGroup.objects.all().exclude(id__in=education_groups)
-        else:
-            qs = EducationGroup.objects.all()
         if self.q:
-            qs = qs.filter(name__istartswith=self.q)
-        return qs
+            return search_prefix(qs, ('last_name', 'first_name'), self.q).order_by(
+                'last_name_lower', 'first_name_lower', 'pk')
+        return qs.order_by('pk')
 
 
-class TeacherAutocomplete(autocomplete.Select2QuerySetView):
-    def get_queryset(self):
-        if not self.request.user.is_authenticated:
-            return Teacher.objects.none()
-        teachers = self.forwarded.get('teachers', None)
+class EducationGroupAutocomplete(PrefixIndexAutocompleteMixin, VersionETagMixin, autocomplete.Select2QuerySetView):
+    etag_models = (EducationGroup,)
+    cache_max_age = 10
+    prefix_index = PrefixIndex(EducationGroup, 'name')
+    forward_exclude = 'education_groups'
 
-        if teachers:
-            qs = Teacher.objects.all().exclude(id__in=teachers)
-        else:
-            qs = Teacher.objects.all()
-        if self.q:
-            qs = qs.filter(last_name__istartswith=self.q)
-        return qs
 
+class TeacherAutocomplete(PrefixIndexAutocompleteMixin, VersionETagMixin, autocomplete.Select2QuerySetView):
+    etag_models = (Teacher,)
+    cache_max_age = 10
+    prefix_index = PrefixIndex(Teacher, 'last_name')
+    forward_exclude = 'teachers'
 
-class CourseAutocomplete(autocomplete.Select2QuerySetView):
-    def get_queryset(self):
-        if not self.request.user.is_authenticated:
-            return Course.objects.none()
-        courses = self.forwarded.get('courses', None)
 
-        if courses:
-            qs = Course.objects.all().exclude(id__in=courses)
-        else:
-            qs = Course.objects.all()
-        if self.q:
-            qs = qs.filter(title__istartswith=self.q)
-        return qs
+class CourseAutocomplete(PrefixIndexAutocompleteMixin, VersionETagMixin, autocomplete.Select2QuerySetView):
+    etag_models = (Course,)
+    cache_max_age = 10
+    prefix_index = PrefixIndex(Course, 'title')
+    forward_exclude = 'courses'
 
 
 class StudentFilterMixin(object):
@@ -109,11 +121,12 @@ class StudentFilterMixin(object):
         return reverse('dashboard:education-student-list')
 
 
-class StudentListView(StudentFilterMixin, SingleTableView):
+class StudentListView(KeysetPaginationMixin, StudentFilterMixin, DashboardListView):
     template_name = 'dashboard/education/student/list.html'
     form_class = StudentSearchForm
     table_class = StudentTable
     context_table_name = 'students'
+    bulk_actions = DashboardListView.bulk_actions + (AssignGroupAction('education_groups'),)
 
     def get_context_data(self, **kwargs):
         ctx = super(StudentListView, self).get_context_data(**kwargs)
@@ -131,7 +144,7 @@ class StudentListView(StudentFilterMixin, SingleTableView):
             return queryset
         data = self.form.cleaned_data
         if data.get('last_name'):
-            queryset = queryset.filter(last_name__icontains=data['last_name'])
+            queryset = search(queryset, 'last_name', data['last_name'])
 
         return queryset
 
@@ -204,7 +217,7 @@ class EducationGroupFilterMixin(object):
         return reverse('dashboard:education-group-list')
 
 
-class EducationGroupListView(EducationGroupFilterMixin, SingleTableView):
+class EducationGroupListView(EducationGroupFilterMixin, DashboardListView):
     template_name = 'dashboard/education/group/list.html'
     form_class = EducationGroupSearchForm
     table_class = EducationGroupTable
@@ -226,7 +239,7 @@ class EducationGroupListView(EducationGroupFilterMixin, SingleTableView):
             return queryset
         data = self.form.cleaned_data
         if data.get('name'):
-            queryset = queryset.filter(name__icontains=data['name'])
+            queryset = search(queryset, 'name', data['name'])
 
         return queryset
 
@@ -277,6 +290,35 @@ class EducationGroupUpdateView(EducationGroupFilterMixin, UpdateView):
         return super(EducationGroupUpdateView, self).get_success_url()
 
 
+class EducationGroupRosterView(EducationGroupFilterMixin, SingleObjectMixin, FormView):
+    template_name = 'dashboard/education/group/form.html'
+    form_class = EducationGroupRosterForm
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return super(EducationGroupRosterView, self).get(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return super(EducationGroupRosterView, self).post(request, *args, **kwargs)
+
+    def get_form_kwargs(self):
+        kwargs = super(EducationGroupRosterView, self).get_form_kwargs()
+        kwargs['group'] = self.object
+        return kwargs
+
+    def get_context_data(self, **kwargs):
+        ctx = super(EducationGroupRosterView, self).get_context_data(**kwargs)
+        ctx['title'] = _('Students of group: %s') % self.object
+        return ctx
+
+    def form_valid(self, form):
+        added, removed = form.save()
+        messages.info(self.request, _('%(added)d students added, %(removed)d removed') % {
+            'added': len(added), 'removed': len(removed)})
+        return super(EducationGroupRosterView, self).form_valid(form)
+
+
 class TeacherFilterMixin(object):
     model = Teacher
 
@@ -299,7 +341,7 @@ class TeacherFilterMixin(object):
         return reverse('dashboard:education-teacher-list')
 
 
-class TeacherListView(TeacherFilterMixin, SingleTableView):
+class TeacherListView(TeacherFilterMixin, DashboardListView):
     template_name = 'dashboard/education/teacher/list.html'
     form_class = TeacherSearchForm
     table_class = TeacherTable
@@ -321,7 +363,7 @@ class TeacherListView(TeacherFilterMixin, SingleTableView):
             return queryset
         data = self.form.cleaned_data
         if data.get('last_name'):
-            queryset = queryset.filter(last_name__icontains=data['last_name'])
+            queryset = search(queryset, 'last_name', data['last_name'])
 
         return queryset
 
@@ -394,7 +436,7 @@ class CourseFilterMixin(object):
         return reverse('dashboard:education-course-list')
 
 
-class CourseListView(CourseFilterMixin, SingleTableView):
+class CourseListView(CourseFilterMixin, DashboardListView):
     template_name = 'dashboard/education/course/list.html'
     form_class = CourseSearchForm
     table_class = CourseTable
@@ -416,7 +458,7 @@ class CourseListView(CourseFilterMixin, SingleTableView):
             return queryset
         data = self.form.cleaned_data
         if data.get('title'):
-            queryset = queryset.filter(title__icontains=data['title'])
+            queryset = search(queryset, 'title', data['title'])
 
         return queryset
 
@@ -489,7 +531,7 @@ class LectureFilterMixin(object):
         return reverse('dashboard:education-lecture-list')
 
 
-class LectureListView(LectureFilterMixin, SingleTableView):
+class LectureListView(KeysetPaginationMixin, LectureFilterMixin, DashboardListView):
     template_name = 'dashboard/education/lecture/list.html'
     form_class = LectureSearchForm
     table_class = LectureTable
@@ -511,11 +553,86 @@ class LectureListView(LectureFilterMixin, SingleTableView):
             return queryset
         data = self.form.cleaned_data
         if data.get('title'):
-            queryset = queryset.filter(title__icontains=data['title'])
+            queryset = search(queryset, 'title', data['title'])
 
         return queryset
 
 
+class LectureCalendarView(LectureFilterMixin, VersionETagMixin, View):
+    """
+    JSON list of the lectures overlapping ``[start, end)``, read with three
+    queries however many lectures there are: the lectures with their
+    course, then the teachers and the groups of all of them.
+    """
+    form_class = LectureCalendarForm
+    etag_models = (
+        Lecture, Course, Teacher, EducationGroup,
+        Lecture.teachers.through, Lecture.groups.through)
+    # Fields making up the names of the teachers and groups of a lecture.
+    resource_names = (
+        ('teachers', ('first_name', 'last_name')),
+        ('groups', ('name',)),
+    )
+
+    def get(self, request, *args, **kwargs):
+        form = self.form_class(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        lectures = self.get_lectures(form.cleaned_data)
+        return JsonResponse({'lectures': lectures})
+
+    def get_queryset(self):
+        return self.filter_queryset(Lecture.objects.all())
+
+    def filter_lectures(self, qs, data):
+        qs = qs.filter(start__lt=data['end'], finish__gt=data['start'])
+        if data.get('course'):
+            qs = qs.filter(course_id=data['course'])
+        if data.get('teacher'):
+            qs = qs.filter(teachers=data['teacher'])
+        if data.get('group'):
+            qs = qs.filter(groups=data['group'])
+        return qs
+
+    def get_lectures(self, data):
+        qs = self.filter_lectures(self.get_queryset(), data)
+        lectures = [{
+            'id': pk,
+            'title': title,
+            'start': start,
+            'finish': finish,
+            'course': {'id': course_id, 'title': course_title},
+            'teachers': [],
+            'groups': [],
+        } for pk, title, start, finish, course_id, course_title in qs.order_by('start', 'pk').values_list(
+            'pk', 'title', 'start', 'finish', 'course_id', 'course__title')]
+        if not lectures:
+            return lectures
+        by_pk = dict((lecture['id'], lecture) for lecture in lectures)
+        for field, names in self.resource_names:
+            through, lecture_name, resource_name = get_through(field)
+            links = through.objects.filter(**{lecture_name + '__in': qs.values('pk')}).order_by(
+                resource_name + '__' + names[-1], resource_name + '_id')
+            for row in links.values_list(
+                    lecture_name + '_id', resource_name + '_id', *[resource_name + '__' + name for name in names]):
+                by_pk[row[0]][field].append({'id': row[1], 'name': ' '.join(row[2:])})
+        return lectures
+
+
+class LectureConflictMixin(object):
+    """
+    Show the form again with the conflicts its ``save()`` found, made by
+    another save since the form was validated.
+    """
+
+    def form_valid(self, form):
+        try:
+            return super(LectureConflictMixin, self).form_valid(form)
+        except ConflictError as error:
+            form.add_conflict_errors(error.conflicts)
+            return self.form_invalid(form)
+
+
 class LectureDeleteView(LectureFilterMixin, DeleteView):
     template_name = 'dashboard/education/lecture/delete.html'
 
@@ -528,7 +645,7 @@ class LectureDeleteView(LectureFilterMixin, DeleteView):
         return super(LectureDeleteView, self).get_success_url()
 
 
-class LectureCreateView(LectureFilterMixin, CreateView):
+class LectureCreateView(LectureConflictMixin, LectureFilterMixin, CreateView):
     template_name = 'dashboard/education/lecture/form.html'
     form_class = LectureForm
 
@@ -548,7 +665,26 @@ class LectureCreateView(LectureFilterMixin, CreateView):
         return initial
 
 
-class LectureUpdateView(LectureFilterMixin, UpdateView):
+class LectureSeriesCreateView(LectureFilterMixin, FormView):
+    template_name = 'dashboard/education/lecture/form.html'
+    form_class = LectureSeriesForm
+
+    def get_context_data(self, **kwargs):
+        ctx = super(LectureSeriesCreateView, self).get_context_data(**kwargs)
+        ctx['title'] = _('Add a lecture series')
+        return ctx
+
+    def form_valid(self, form):
+        try:
+            lectures = form.save()
+        except ConflictError as error:
+            form.add_conflict_errors(error.conflicts)
+            return self.form_invalid(form)
+        messages.info(self.request, _('%d lectures created successfully') % len(lectures))
+        return super(LectureSeriesCreateView, self).form_valid(form)
+
+
+class LectureUpdateView(LectureConflictMixin, LectureFilterMixin, UpdateView):
     template_name = 'dashboard/education/lecture/form.html'
     form_class = LectureForm
 
@@ -560,3 +696,37 @@ class LectureUpdateView(LectureFilterMixin, UpdateView):
     def get_success_url(self):
         messages.info(self.request, _('Lecture updated successfully'))
         return super(LectureUpdateView, self).get_success_url()
+
+
+class EducationImportView(FormView):
+    template_name = 'dashboard/education/import.html'
+    form_class = ImportForm
+
+    @method_decorator(login_required)
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            raise PermissionDenied
+        return super(EducationImportView, self).dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        ctx = super(EducationImportView, self).get_context_data(**kwargs)
+        ctx['title'] = _('Import')
+        return ctx
+
+    def form_valid(self, form):
+        importer = IMPORTERS[form.cleaned_data['kind']]()
+        # The upload is read row by row, whatever its size.
+        stream = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+        try:
+            # A file failing halfway imports nothing.
+            with transaction.atomic(using=router.db_for_write(importer.model)):
+                importer.run(stream)
+        except UnicodeDecodeError:
+            form.add_error('file', _('The file is not UTF-8 encoded.'))
+            return self.form_invalid(form)
+        except csv.Error as e:
+            form.add_error('file', _('The file is not valid CSV: %s.') % e)
+            return self.form_invalid(form)
+        messages.info(self.request, _('%(imported)d rows imported, %(failed)d rows skipped') % {
+            'imported': importer.imported, 'failed': importer.failed})
+        return self.render_to_response(self.get_context_data(form=self.form_class(), importer=importer))
@@ -0,0 +1,185 @@
+import csv
+import datetime
+import io
+import zipfile
+
+from django.utils import six, timezone
+from django.utils.encoding import force_text
+from django.utils.xmlutils import SimplerXMLGenerator
+from django_tables2.rows import BoundRow
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def iter_table_values(table, chunk_size=2000):
+    """
+    Like ``Table.as_values()`` but reads the ordered queryset of *table* with
+    ``QuerySet.iterator()``, which uses a server-side cursor on PostgreSQL, so
+    rows are never all in memory at once. Columns marked
+    ``exclude_from_export`` are left out.
+    """
+    columns = [column for column in table.columns if not column.column.exclude_from_export]
+    yield [force_text(column.header, strings_only=True) for column in columns]
+    for record in table.data.data.iterator(chunk_size=chunk_size):
+        row = BoundRow(record, table=table)
+        yield [row.get_cell_value(column.name) for column in columns]
+
+
+def cell_text(value):
+    if value is None:
+        return ''
+    return force_text(value)
+
+
+class _Buffer(object):
+    """
+    Write only file object handing out what was written since the last
+    ``drain()``, to turn writers into generators.
+    """
+
+    def __init__(self, empty):
+        self.empty = empty
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = self.empty.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_csv(rows):
+    buffer = _Buffer('')
+    writer = csv.writer(buffer)
+    # Excel needs the BOM to read the file as UTF-8.
+    yield '\ufeff'
+    for row in rows:
+        writer.writerow([cell_text(value) for value in row])
+        yield buffer.drain()
+
+
+XLSX_STATIC_PARTS = (
+    ('[Content_Types].xml', (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>')),
+    ('_rels/.rels', (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>')),
+    ('xl/workbook.xml', (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>')),
+    ('xl/_rels/workbook.xml.rels', (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '<Relationship Id="rId2" Target="styles.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+        '</Relationships>')),
+    # Style 1 formats dates, style 2 date times.
+    ('xl/styles.xml', (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm"/></numFmts>'
+        '<fonts count="1"><font/></fonts>'
+        '<fills count="1"><fill/></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="3"><xf/><xf numFmtId="14" applyNumberFormat="1"/>'
+        '<xf numFmtId="164" applyNumberFormat="1"/></cellXfs>'
+        '</styleSheet>')),
+)
+
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+
+def _xlsx_cell(xml, value):
+    if isinstance(value, bool):
+        xml.startElement('c', {'t': 'b'})
+        xml.addQuickElement('v', '1' if value else '0')
+    elif isinstance(value, six.integer_types + (float,)):
+        xml.startElement('c', {})
+        xml.addQuickElement('v', repr(value))
+    elif isinstance(value, (datetime.date, datetime.datetime)):
+        if isinstance(value, datetime.datetime):
+            style = '2'
+            if timezone.is_aware(value):
+                value = timezone.localtime(value)
+            delta = value.replace(tzinfo=None) - EXCEL_EPOCH
+        else:
+            style = '1'
+            delta = datetime.datetime.combine(value, datetime.time()) - EXCEL_EPOCH
+        xml.startElement('c', {'s': style})
+        xml.addQuickElement('v', repr(delta.days + delta.seconds / 86400.0))
+    else:
+        xml.startElement('c', {'t': 'inlineStr'})
+        xml.startElement('is', {})
+        xml.addQuickElement('t', cell_text(value), {'xml:space': 'preserve'})
+        xml.endElement('is')
+    xml.endElement('c')
+
+
+def stream_xlsx(rows):
+    """
+    Write *rows* as a single sheet XLSX workbook with inline strings, yielding
+    the compressed bytes as they are produced.
+    """
+    buffer = _Buffer(b'')
+    archive = zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED)
+    for name, content in XLSX_STATIC_PARTS:
+        archive.writestr(name, content)
+    yield buffer.drain()
+    with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+        text = io.TextIOWrapper(sheet, encoding='utf-8')
+        xml = SimplerXMLGenerator(text, 'utf-8')
+        xml.startDocument()
+        xml.startElement('worksheet', {'xmlns': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'})
+        xml.startElement('sheetData', {})
+        for row in rows:
+            xml.startElement('row', {})
+            for value in row:
+                _xlsx_cell(xml, value)
+            xml.endElement('row')
+            text.flush()
+            yield buffer.drain()
+        xml.endElement('sheetData')
+        xml.endElement('worksheet')
+        text.flush()
+        text.detach()
+    archive.close()
+    yield buffer.drain()
+
+
+EXPORT_WRITERS = {
+    'csv': stream_csv,
+    'xlsx': stream_xlsx,
+}
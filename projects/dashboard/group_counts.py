@@ -0,0 +1,91 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from projects.education.models import EducationGroup, Lecture, Student
+
+from .versions import touch
+
+# The relations to EducationGroup whose size is kept in a counter field.
+COUNTERS = (
+    (Student, 'education_groups', 'student_count'),
+    (Lecture, 'groups', 'lecture_count'),
+)
+
+
+def _relations():
+    for model, relation, counter in COUNTERS:
+        field = model._meta.get_field(relation)
+        yield field.remote_field.through, (field.m2m_field_name(), field.m2m_reverse_field_name(), counter)
+
+
+# Through model -> (source foreign key, group foreign key, counter field).
+RELATIONS = dict(_relations())
+
+
+def change_counts(counter, group_pks, sign):
+    """
+    Add *sign* to *counter* of every group in *group_pks* once per
+    occurrence, with one ``UPDATE ... SET counter = counter + n`` per
+    distinct *n*. Counters never go below zero: one which drifted is left
+    at zero for ``reconcile()`` rather than failing the write.
+    """
+    by_delta = defaultdict(list)
+    for pk, times in Counter(group_pks).items():
+        by_delta[times].append(pk)
+    for times, pks in by_delta.items():
+        value = F(counter) + sign * times
+        if sign < 0:
+            value = Greatest(value, 0)
+        EducationGroup.objects.filter(pk__in=pks).update(**{counter: value})
+    if by_delta:
+        touch(EducationGroup)
+
+
+def m2m_changed_handler(sender, instance, action, reverse, pk_set, **kwargs):
+    source, target, counter = RELATIONS[sender]
+    if action == 'post_add':
+        # pk_set only holds the links which did not exist yet.
+        change_counts(counter, [instance.pk] * len(pk_set) if reverse else pk_set, 1)
+    elif action in ('pre_remove', 'pre_clear'):
+        # pk_set may name objects which are not linked, count the links.
+        links = sender.objects.filter(**{(target if reverse else source) + '_id': instance.pk})
+        if pk_set is not None:
+            links = links.filter(**{(source if reverse else target) + '_id__in': pk_set})
+        instance._group_count_links = list(links.values_list(target + '_id', flat=True))
+    elif action in ('post_remove', 'post_clear'):
+        change_counts(counter, getattr(instance, '_group_count_links', None) or (), -1)
+        instance._group_count_links = None
+
+
+def pre_delete_handler(sender, instance, **kwargs):
+    """
+    Uncount the groups of a student or lecture being deleted, whose links
+    go away with it without ``m2m_changed``.
+    """
+    for through, (source, target, counter) in RELATIONS.items():
+        if through._meta.get_field(source).related_model is sender:
+            links = through.objects.filter(**{source + '_id': instance.pk})
+            change_counts(counter, links.values_list(target + '_id', flat=True), -1)
+
+
+def reconcile(pks=None):
+    """
+    Recount the members of the groups with *pks*, or of all groups, with one
+    ``UPDATE`` and return the number of groups whose counts were wrong.
+    """
+    groups = EducationGroup.objects.all()
+    if pks is not None:
+        groups = groups.filter(pk__in=pks)
+    actual = {}
+    for through, (source, target, counter) in RELATIONS.items():
+        actual[counter] = Coalesce(Subquery(
+            through.objects.filter(**{target: OuterRef('pk')}).order_by().values(target).annotate(
+                count=Count('pk')).values('count')), 0)
+    rows = groups.annotate(**dict(('actual_' + counter, value) for counter, value in actual.items())).values(
+        'pk', *[name for counter in actual for name in (counter, 'actual_' + counter)])
+    wrong = [row['pk'] for row in rows if any(row[counter] != row['actual_' + counter] for counter in actual)]
+    if wrong:
+        EducationGroup.objects.filter(pk__in=wrong).update(**actual)
+        touch(EducationGroup)
+    return len(wrong)
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+# Requests kept per view for the quantiles of the metrics endpoint.
+METRICS_SAMPLES = getattr(settings, 'DASHBOARD_METRICS_SAMPLES', 1000)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class QueryStats(object):
+    """
+    Execute wrapper counting the queries of a request, their total duration
+    and the duplicates, queries whose SQL and parameters were already run.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.duplicates = 0
+        self.seen = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            key = (sql, repr(params))
+            if key in self.seen:
+                self.duplicates += 1
+            else:
+                self.seen.add(key)
+
+
+class Summary(object):
+    """
+    Prometheus summary over the last *samples* observations of each label,
+    with the total count and sum of all of them.
+    """
+
+    def __init__(self, name, help_text, samples=METRICS_SAMPLES):
+        self.name = name
+        self.help_text = help_text
+        self.values = defaultdict(lambda: deque(maxlen=samples))
+        self.counts = defaultdict(int)
+        self.sums = defaultdict(float)
+
+    def observe(self, label, value):
+        self.values[label].append(value)
+        self.counts[label] += 1
+        self.sums[label] += value
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help_text), '# TYPE %s summary' % self.name]
+        for label in sorted(self.values):
+            values = sorted(self.values[label])
+            for quantile in QUANTILES:
+                value = values[min(int(quantile * len(values)), len(values) - 1)]
+                lines.append('%s{view="%s",quantile="%s"} %r' % (self.name, escape_label(label), quantile, value))
+            lines.append('%s_sum{view="%s"} %r' % (self.name, escape_label(label), self.sums[label]))
+            lines.append('%s_count{view="%s"} %d' % (self.name, escape_label(label), self.counts[label]))
+        return lines
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics(object):
+    """
+    Per process request metrics by URL name, rendered in the Prometheus
+    text format by ``MetricsView``.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.summaries = (
+            Summary('ostov_request_duration_seconds', 'Time spent in the view and middleware.'),
+            Summary('ostov_request_db_duration_seconds', 'Time spent running SQL queries.'),
+            Summary('ostov_request_queries', 'SQL queries run.'),
+            Summary('ostov_request_duplicate_queries', 'SQL queries run again with the same parameters.'),
+        )
+
+    def observe(self, view, duration, stats):
+        with self.lock:
+            for summary, value in zip(self.summaries, (
+                    duration, stats.duration, stats.count, stats.duplicates)):
+                summary.observe(view, value)
+
+    def render(self):
+        with self.lock:
+            return '\n'.join(line for summary in self.summaries for line in summary.render()) + '\n'
+
+
+metrics = Metrics()
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+class SQLInstrumentationMiddleware(object):
+    """
+    Count the queries of every request on all database connections and
+    report them in a ``Server-Timing`` header and in ``metrics``. Queries
+    run while a streaming response is consumed are not included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        metrics.observe(get_view_name(request), duration, stats)
+        response['Server-Timing'] = ', '.join((
+            'db;dur=%.1f;desc="%d queries, %d duplicates"' % (stats.duration * 1000, stats.count, stats.duplicates),
+            'total;dur=%.1f' % (duration * 1000),
+        ))
+        return response
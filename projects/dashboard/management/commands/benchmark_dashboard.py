@@ -0,0 +1,55 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from projects.dashboard.benchmarks import Benchmark, BenchmarkError, compare, dump
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the dashboard URLs and the model and form hot paths against the current database and write '
+        'the results as JSON, optionally comparing them with an earlier run.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--output', help='File to write the JSON results to, "-" for standard output.')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare with.')
+        parser.add_argument(
+            '--threshold', type=float, default=1.2,
+            help='Slowdown of the median counted as a regression.')
+        parser.add_argument('--select', nargs='*', help='Only run the benchmarks whose name contains one of these.')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be positive')
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as stream:
+                    previous = json.load(stream)
+            except (IOError, ValueError) as e:
+                raise CommandError(e)
+        self.verbosity = options['verbosity']
+        try:
+            results = Benchmark(repeat=options['repeat'], select=options['select']).run(progress=self.progress)
+        except BenchmarkError as e:
+            raise CommandError(e)
+        if options['output'] == '-':
+            dump(results, sys.stdout)
+        elif options['output']:
+            with open(options['output'], 'w') as stream:
+                dump(results, stream)
+        if previous is not None:
+            regressions = 0
+            for name, before, after, ratio, regressed in compare(previous, results, options['threshold']):
+                regressions += regressed
+                line = '%-45s %8.2fms -> %8.2fms  x%.2f  %d -> %d queries' % (
+                    name, before['median'] * 1000, after['median'] * 1000, ratio, before['queries'], after['queries'])
+                self.stderr.write(self.style.ERROR(line) if regressed else line)
+            if regressions:
+                raise CommandError('%d benchmarks regressed' % regressions)
+
+    def progress(self, result):
+        if self.verbosity >= 1 and result is not None:
+            self.stderr.write('%-45s %8.2fms  %d queries' % (
+                result['name'], result['median'] * 1000, result['queries']))
@@ -0,0 +1,44 @@
+import csv
+import io
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from projects.dashboard.education.importers import IMPORTERS
+
+
+class Command(BaseCommand):
+    help = 'Import students, teachers or education groups from a CSV file with a header row.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help='CSV file to import, "-" reads standard input.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        self.verbosity = options['verbosity']
+        importer = IMPORTERS[options['kind']](batch_size=options['batch_size'], progress=self.progress)
+        if options['path'] == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding=options['encoding'], newline='')
+        else:
+            try:
+                stream = open(options['path'], encoding=options['encoding'], newline='')
+            except IOError as e:
+                raise CommandError(e)
+        try:
+            with stream:
+                importer.run(stream)
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise CommandError('%s (%d rows imported before)' % (e, importer.imported))
+        for line, message in importer.errors:
+            self.stderr.write('line %d: %s' % (line, message))
+        if importer.failed > len(importer.errors):
+            self.stderr.write('... %d more errors' % (importer.failed - len(importer.errors)))
+        self.stdout.write(self.style.SUCCESS(
+            '%d rows imported, %d rows skipped' % (importer.imported, importer.failed)))
+
+    def progress(self, importer):
+        if self.verbosity >= 1:
+            self.stdout.write('%d rows imported, %d rows skipped' % (importer.imported, importer.failed))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from projects.dashboard.stats import recompute
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the dashboard statistics from the database, correcting any drift.'
+
+    def handle(self, *args, **options):
+        changed = recompute()
+        self.stdout.write(self.style.SUCCESS('%d statistics corrected' % changed))
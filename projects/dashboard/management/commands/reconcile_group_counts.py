@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from projects.dashboard.group_counts import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount the students and lectures of every education group.'
+
+    def handle(self, *args, **options):
+        wrong = reconcile()
+        self.stdout.write(self.style.SUCCESS('%d education groups corrected' % wrong))
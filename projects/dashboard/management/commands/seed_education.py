@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from projects.dashboard.education.seed import Seeder
+
+
+class Command(BaseCommand):
+    help = 'Fill the education tables with synthetic data for benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=10000)
+        parser.add_argument('--teachers', type=int, default=2000)
+        parser.add_argument('--courses', type=int, default=500)
+        parser.add_argument('--students', type=int, default=1000000)
+        parser.add_argument('--lectures', type=int, default=100000)
+        parser.add_argument('--groups-per-student', type=int, default=2)
+        parser.add_argument('--teachers-per-lecture', type=int, default=1)
+        parser.add_argument('--groups-per-lecture', type=int, default=3)
+        parser.add_argument(
+            '--user-share', type=float, default=0.5, help='Share of the students and teachers linked to a user.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, the same seed gives the same data.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        self.verbosity = options['verbosity']
+        seeder = Seeder(
+            counts={
+                'user': options['users'],
+                'educationgroup': options['groups'],
+                'teacher': options['teachers'],
+                'course': options['courses'],
+                'student': options['students'],
+                'lecture': options['lectures'],
+            },
+            groups_per_student=options['groups_per_student'],
+            teachers_per_lecture=options['teachers_per_lecture'],
+            groups_per_lecture=options['groups_per_lecture'], user_share=options['user_share'],
+            batch_size=options['batch_size'], seed=options['seed'], progress=self.progress)
+        seeder.run()
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            '%d %s' % (count, name) for name, count in sorted(seeder.created.items()))))
+
+    def progress(self, model, created, total):
+        if self.verbosity >= 1:
+            self.stdout.write('%s: %d of %d' % (model._meta.verbose_name_plural, created, total))
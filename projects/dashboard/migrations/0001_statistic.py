@@ -0,0 +1,33 @@
+# Generated by Django 2.0.7 on 2026-10-18 10:48
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Statistic',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, verbose_name='Name')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Object id')),
+                ('period', models.DateField(default=datetime.date(1, 1, 1), verbose_name='Period')),
+                ('value', models.FloatField(default=0, verbose_name='Value')),
+            ],
+            options={
+                'verbose_name': 'Statistic',
+                'verbose_name_plural': 'Statistics',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='statistic',
+            unique_together={('name', 'period', 'object_id')},
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.0.7 on 2026-10-18 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_statistic'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=128, unique=True, verbose_name='Table')),
+                ('version', models.BigIntegerField(default=1, verbose_name='Version')),
+            ],
+            options={
+                'verbose_name': 'Table version',
+                'verbose_name_plural': 'Table versions',
+            },
+        ),
+    ]
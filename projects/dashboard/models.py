@@ -1,3 +1,46 @@
-from django.db import models  # NOQA
+import datetime
 
-# Create your models here.
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+
+class Statistic(models.Model):
+    """
+    Precomputed dashboard number, e.g. the active students of a group or the
+    lecture hours of a teacher in a week. Kept up to date by the signal
+    handlers of ``projects.dashboard.stats`` and rebuilt by the
+    ``recompute_dashboard_stats`` command. Numbers which are not about a
+    period use ``ALWAYS``, which keeps them unique in the database.
+    """
+    ALWAYS = datetime.date.min
+
+    name = models.CharField(_('Name'), max_length=64)
+    object_id = models.PositiveIntegerField(_('Object id'))
+    period = models.DateField(_('Period'), default=ALWAYS)
+    value = models.FloatField(_('Value'), default=0)
+
+    def __str__(self):
+        return '%s %s %s' % (self.name, self.object_id, self.period)
+
+    class Meta:
+        unique_together = ('name', 'period', 'object_id')
+        verbose_name = _('Statistic')
+        verbose_name_plural = _('Statistics')
+
+
+class TableVersion(models.Model):
+    """
+    Version stamp of a database table, bumped by
+    ``projects.dashboard.versions.touch()`` once a write to the table is
+    committed. Kept in the database, and so on its replicas, for all the
+    processes to see the same stamps.
+    """
+    table = models.CharField(_('Table'), max_length=128, unique=True)
+    version = models.BigIntegerField(_('Version'), default=1)
+
+    def __str__(self):
+        return '%s %s' % (self.table, self.version)
+
+    class Meta:
+        verbose_name = _('Table version')
+        verbose_name_plural = _('Table versions')
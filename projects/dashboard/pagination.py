@@ -0,0 +1,309 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+from django.utils.translation import ugettext_lazy as _
+from django_tables2.rows import BoundRows
+
+from .counts import get_count
+
+
+def count_rows(rows):
+    """
+    Count table *rows* through the dashboard count strategy when they are
+    backed by a queryset.
+    """
+    data = getattr(rows.data, 'data', None)
+    if hasattr(data, 'query'):
+        return get_count(data)
+    return len(rows)
+
+
+class CountingPaginator(Paginator):
+    """
+    ``Paginator`` for ``DashboardTable`` rows taking its count from
+    ``projects.dashboard.counts`` instead of a ``COUNT(*)`` per render.
+    """
+
+    @cached_property
+    def count(self):
+        return count_rows(self.object_list)
+
+
+class FetchAheadPaginator(Paginator):
+    """
+    ``Paginator`` which never counts: a page fetches one row more than it
+    shows to find out whether there is a next page. ``count`` and
+    ``num_pages`` still work but cost a ``COUNT(*)``.
+    """
+
+    def page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        bottom = (number - 1) * self.per_page
+        records = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not records and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        return FetchAheadPage(records[:self.per_page], number, self, len(records) > self.per_page)
+
+
+class FetchAheadPage(Page):
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super(FetchAheadPage, self).__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class KeysetPaginator(object):
+    """
+    Paginator for ``DashboardTable`` rows which seeks on the ordering columns
+    plus ``pk`` instead of using OFFSET/LIMIT, so that every page costs the
+    same no matter how deep it is.
+
+    Pages are addressed by an opaque *cursor* (see ``KeysetPage.next_cursor``
+    and ``KeysetPage.previous_cursor``) instead of a page number. A cursor
+    built for a different ordering is ignored and the first page is shown,
+    which keeps the column sort links working.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, cursor=None, orphans=0, **kwargs):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.cursor = cursor
+        self.terms = get_keyset_ordering(self.queryset)
+
+    @cached_property
+    def queryset(self):
+        return self.object_list.data.data
+
+    @cached_property
+    def count(self):
+        return count_rows(self.object_list)
+
+    @cached_property
+    def signature(self):
+        return [[path, descending] for path, descending, nullable in self.terms]
+
+    def page(self, number=1):
+        """
+        Return the ``KeysetPage`` for the paginator cursor, *number* is only
+        accepted for compatibility with ``Table.paginate``.
+        """
+        position = decode_cursor(self.cursor)
+        if position is None or position['o'] != self.signature:
+            return self._fetch(None, forward=True)
+        return self._fetch(position['v'], forward=position['d'] == 'n')
+
+    def _fetch(self, values, forward):
+        qs = self.queryset.order_by(*self._order_by(forward))
+        loaded, deferred = qs.query.deferred_loading
+        if loaded and not deferred:
+            # Values for the next cursors are read from the records, make
+            # sure a projection with only() does not defer them.
+            qs = qs.only(*set(loaded) | self.record_fields)
+        if values is not None:
+            qs = qs.filter(seek_filter(self.terms, values, forward))
+        records = list(qs[:self.per_page + 1])
+        has_more = len(records) > self.per_page
+        records = records[:self.per_page]
+        if forward:
+            has_next, has_previous = has_more, values is not None
+        else:
+            records.reverse()
+            has_next, has_previous = True, has_more
+        return KeysetPage(records, self, has_next, has_previous)
+
+    def _order_by(self, forward):
+        ordering = []
+        for path, descending, nullable in self.terms:
+            descending = descending if forward else not descending
+            if not nullable:
+                ordering.append('-' + path if descending else path)
+                continue
+            # NULLs always sort last when paging forward, whatever the
+            # database default, so the seek filter below can rely on it.
+            expression = F(path)
+            nulls = {'nulls_last': True} if forward else {'nulls_first': True}
+            ordering.append(expression.desc(**nulls) if descending else expression.asc(**nulls))
+        return ordering
+
+    @cached_property
+    def record_fields(self):
+        opts = self.queryset.model._meta
+        fields = set()
+        for path, descending, nullable in self.terms:
+            name = path.split('__')[0]
+            if name in self.queryset.query.annotations:
+                continue
+            fields.add('pk' if name in ('pk', opts.pk.attname) else opts.get_field(name).name)
+        return fields
+
+    def values_for(self, record):
+        return [resolve_record_value(record, path) for path, descending, nullable in self.terms]
+
+    def encode(self, record, direction):
+        return encode_cursor({'o': self.signature, 'v': self.values_for(record), 'd': direction})
+
+
+class KeysetPage(object):
+
+    def __init__(self, records, paginator, has_next, has_previous):
+        self.records = records
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<KeysetPage (%d records)>' % len(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    @cached_property
+    def object_list(self):
+        rows = self.paginator.object_list
+        return BoundRows(data=self.records, table=rows.table, pinned_data=rows.pinned_data)
+
+    def has_next(self):
+        return self._has_next and bool(self.records)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @cached_property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.encode(self.records[-1], 'n')
+
+    @cached_property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.records:
+            return None
+        return self.paginator.encode(self.records[0], 'p')
+
+
+def encode_cursor(position):
+    data = json.dumps(position, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by ``encode_cursor``, returning ``None`` for
+    missing or tampered values so callers can fall back to the first page.
+    """
+    if not cursor:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(data.decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(position, dict) or not {'o', 'v', 'd'} <= set(position):
+        return None
+    return position
+
+
+def get_keyset_ordering(queryset):
+    """
+    Return the ordering of *queryset* as a list of ``(path, descending,
+    nullable)`` terms, with relations expanded the way Django orders them and
+    the primary key appended as tie breaker.
+    """
+    query = queryset.query
+    ordering = query.order_by or (query.default_ordering and query.get_meta().ordering) or []
+    model = queryset.model
+    terms = []
+    for term in ordering:
+        if not isinstance(term, str):
+            raise ImproperlyConfigured(
+                'KeysetPaginator can only seek on field names, got %r' % (term,))
+        if term == '?':
+            raise ImproperlyConfigured('KeysetPaginator can not seek on random ordering')
+        descending = term.startswith('-')
+        if term.lstrip('-') in query.annotations:
+            terms.append((term.lstrip('-'), descending, False))
+            continue
+        terms.extend(_resolve_ordering(model, term.lstrip('-'), descending))
+    pk_name = model._meta.pk.attname
+    if not terms or terms[-1][0] not in ('pk', pk_name):
+        terms.append((pk_name, False, False))
+    return terms
+
+
+def _resolve_ordering(model, name, descending, prefix='', nullable=False, depth=0):
+    opts = model._meta
+    parts = name.split('__')
+    for index, part in enumerate(parts):
+        try:
+            field = opts.pk if part == 'pk' else opts.get_field(part)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured('KeysetPaginator can not seek on %s%s' % (prefix, name))
+        nullable = nullable or field.null
+        if not field.is_relation:
+            continue
+        if field.many_to_many or field.one_to_many:
+            raise ImproperlyConfigured(
+                'KeysetPaginator can not seek on multi-valued %s%s' % (prefix, name))
+        if index + 1 < len(parts):
+            opts = field.related_model._meta
+            continue
+        related_ordering = field.related_model._meta.ordering
+        if not related_ordering or depth > 2:
+            return [(prefix + '__'.join(parts[:-1] + [field.attname]), descending, nullable)]
+        terms = []
+        for term in related_ordering:
+            terms.extend(_resolve_ordering(
+                field.related_model, term.lstrip('-'), descending != term.startswith('-'),
+                prefix=prefix + name + '__', nullable=nullable, depth=depth + 1))
+        return terms
+    return [(prefix + name, descending, nullable)]
+
+
+def resolve_record_value(record, path):
+    value = record
+    for part in path.split('__'):
+        if value is None:
+            return None
+        value = getattr(value, part)
+    return value
+
+
+def seek_filter(terms, values, forward):
+    """
+    Build the lexicographic "rows beyond *values*" filter for *terms*, walking
+    forward or backward through the ordering. NULLs sort last going forward.
+    """
+    condition = None
+    equal = Q()
+    for (path, descending, nullable), value in zip(terms, values):
+        if value is None:
+            beyond = None if forward else Q(**{path + '__isnull': False})
+            same = Q(**{path + '__isnull': True})
+        else:
+            lookup = 'lt' if descending == forward else 'gt'
+            beyond = Q(**{'%s__%s' % (path, lookup): value})
+            if forward and nullable:
+                beyond |= Q(**{path + '__isnull': True})
+            same = Q(**{path: value})
+        if beyond is not None:
+            condition = equal & beyond if condition is None else condition | (equal & beyond)
+        equal &= same
+    return condition
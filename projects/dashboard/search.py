@@ -0,0 +1,136 @@
+import unicodedata
+
+from functools import reduce
+from operator import and_, or_
+
+from django.db.models import CharField, FloatField, Func, Q, Value
+from django.db.models.functions import Lower
+from django.db.models.lookups import Contains
+
+SEARCH_RANK = 'search_rank'
+
+
+class SearchText(CharField):
+    """
+    Output field of ``SearchNormalize``.
+    """
+
+
+@SearchText.register_lookup
+class SearchContains(Contains):
+    """
+    ``contains`` which also takes an expression: Django wraps the first
+    parameter of the right-hand side in ``%`` as if it were the pattern.
+    """
+
+    def process_rhs(self, qn, connection):
+        if hasattr(self.rhs, 'as_sql'):
+            return super(Contains, self).process_rhs(qn, connection)
+        return super(SearchContains, self).process_rhs(qn, connection)
+
+
+class SearchNormalize(Func):
+    """
+    Case and accent folded text, matching the expression the trigram indexes
+    of the education migrations are built on.
+    """
+    function = 'ostov_search_normalize'
+    output_field = SearchText()
+
+
+class SearchSimilarity(Func):
+    """
+    Trigram similarity rounded to six decimals, so the rank of a row
+    read back from a keyset cursor compares equal to itself: ``pg_trgm``
+    returns a ``real`` no float parameter matches exactly.
+    """
+    function = 'similarity'
+    template = 'ROUND(%(function)s(%(expressions)s), 6)'
+    output_field = FloatField()
+
+    def as_postgresql(self, compiler, connection):
+        return self.as_sql(compiler, connection, template='ROUND(CAST(%(function)s(%(expressions)s) AS NUMERIC), 6)')
+
+
+def search(queryset, field, value):
+    """
+    Filter *queryset* to rows whose *field* contains *value*, ignoring case
+    and accents, and rank them by trigram similarity. Ties keep the current
+    ordering of the queryset. *value* is folded by the same SQL function as
+    the column, so letters ``unaccent`` spells out (``ß``, ``ł``) match.
+    """
+    text = SearchNormalize(field)
+    term = SearchNormalize(Value(value))
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return queryset.annotate(
+        search_text=text, **{SEARCH_RANK: SearchSimilarity(text, term)}
+    ).filter(search_text__contains=term).order_by('-' + SEARCH_RANK, *ordering)
+
+
+def search_prefix(queryset, fields, value):
+    """
+    Filter *queryset* to rows where every word of *value* is a prefix of one
+    of *fields*, ignoring case, so that "Ada Love" and "love ada" both find
+    Ada Lovelace. Matches ``lower(field) text_pattern_ops`` indexes. The
+    ``<field>_lower`` annotations are added even without words, for
+    callers ordering by them.
+    """
+    queryset = queryset.annotate(**{'%s_lower' % field: Lower(field) for field in fields})
+    tokens = value.lower().split()
+    if not tokens:
+        return queryset
+    return queryset.filter(reduce(and_, (
+        reduce(or_, (Q(**{'%s_lower__startswith' % field: token}) for field in fields))
+        for token in tokens)))
+
+
+def is_ranked(queryset):
+    return SEARCH_RANK in getattr(getattr(queryset, 'query', None), 'annotations', {})
+
+
+# Letters ``unaccent`` replaces which do not decompose into a base letter and marks.
+UNACCENT_LETTERS = {
+    ord('ß'): 'ss', ord('ł'): 'l', ord('Ł'): 'L', ord('ø'): 'o', ord('Ø'): 'O', ord('æ'): 'ae', ord('Æ'): 'AE',
+    ord('œ'): 'oe', ord('Œ'): 'OE', ord('đ'): 'd', ord('Đ'): 'D', ord('þ'): 'th', ord('Þ'): 'TH',
+}
+
+
+def normalize_search_text(value):
+    """
+    Python version of ``ostov_search_normalize()`` for SQLite.
+    """
+    if value is None:
+        return None
+    decomposed = unicodedata.normalize('NFKD', value.translate(UNACCENT_LETTERS))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def trigrams(value):
+    result = set()
+    for word in ''.join(c if c.isalnum() else ' ' for c in value.lower()).split():
+        word = '  %s ' % word
+        result.update(word[i:i + 3] for i in range(len(word) - 2))
+    return result
+
+
+def similarity(a, b):
+    """
+    Python version of ``pg_trgm``'s ``similarity()``.
+    """
+    if a is None or b is None:
+        return None
+    a, b = trigrams(a), trigrams(b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / float(len(a | b))
+
+
+def register_sqlite_functions(sender, connection, **kwargs):
+    """
+    Provide the search SQL functions on SQLite, which is used for local
+    benchmarks, so ``search()`` runs unchanged there (without an index).
+    """
+    if connection.vendor != 'sqlite':
+        return
+    connection.connection.create_function('ostov_search_normalize', 1, normalize_search_text)
+    connection.connection.create_function('similarity', 2, similarity)
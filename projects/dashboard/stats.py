@@ -0,0 +1,344 @@
+import abc
+import datetime
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import six, timezone
+from projects.education.models import Course, EducationGroup, Lecture, Student, Teacher
+
+from .models import Statistic
+
+GROUP_ACTIVE_STUDENTS = 'group_active_students'
+COURSE_WEEK_LECTURES = 'course_week_lectures'
+TEACHER_WEEK_HOURS = 'teacher_week_hours'
+
+# Statistics about the objects of a model, dropped when one is deleted.
+OBJECT_STATISTICS = {
+    EducationGroup: (GROUP_ACTIVE_STUDENTS,),
+    Course: (COURSE_WEEK_LECTURES,),
+    Teacher: (TEACHER_WEEK_HOURS,),
+}
+
+_local = threading.local()
+
+
+def week_of(value):
+    """
+    Return the Monday of the local week of datetime *value*.
+    """
+    return monday_of(timezone.localtime(value).date() if timezone.is_aware(value) else value.date())
+
+
+def monday_of(day):
+    return day - datetime.timedelta(days=day.weekday())
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Tracker(object):
+    """
+    Derives the statistics an object contributes to from its *state*, a dict
+    of its *fields* and of the pk sets of its *relations*. Changes are
+    applied as the difference between the contributions before and after.
+    """
+    model = None
+    fields = ()
+    relations = ()
+
+    def load(self, pks):
+        """
+        Return the current states of the objects with *pks*, with one query
+        per relation.
+        """
+        states = dict(
+            (row.pop('pk'), row) for row in self.model._default_manager.filter(pk__in=pks).values('pk', *self.fields))
+        for relation in self.relations:
+            field = self.model._meta.get_field(relation)
+            through = field.remote_field.through
+            source, target = field.m2m_field_name() + '_id', field.m2m_reverse_field_name() + '_id'
+            for state in states.values():
+                state[relation] = set()
+            if states:
+                for pk, related_pk in through.objects.filter(**{source + '__in': list(states)}).values_list(
+                        source, target):
+                    states[pk][relation].add(related_pk)
+        return states
+
+    def get_related_pks(self, relation, related_pk):
+        """
+        Return the pks of the objects linked to *related_pk* through
+        *relation*, for reverse ``clear()`` calls.
+        """
+        field = self.model._meta.get_field(relation)
+        return list(field.remote_field.through.objects.filter(
+            **{field.m2m_reverse_field_name() + '_id': related_pk}).values_list(
+                field.m2m_field_name() + '_id', flat=True))
+
+    def get_links(self, relation, queryset):
+        """
+        Return the through rows of *relation* of the objects of *queryset*.
+        """
+        field = self.model._meta.get_field(relation)
+        return field.remote_field.through.objects.filter(
+            **{field.m2m_field_name() + '__in': queryset.order_by().values('pk')})
+
+    @abc.abstractmethod
+    def contributions(self, state):
+        """
+        Return the contributions of an object in *state*, or of none with an
+        empty state, as a dict of ``(name, object_id, period)`` to values.
+        """
+
+    @abc.abstractmethod
+    def bulk_contributions(self, queryset):
+        """
+        Return the summed contributions of the objects of *queryset*, computed
+        with aggregate queries instead of loading their states.
+        """
+
+
+class StudentTracker(Tracker):
+    model = Student
+    fields = ('active',)
+    relations = ('education_groups',)
+
+    def contributions(self, state):
+        if not state or not state['active']:
+            return {}
+        return dict(((GROUP_ACTIVE_STUDENTS, pk, Statistic.ALWAYS), 1) for pk in state['education_groups'])
+
+    def bulk_contributions(self, queryset):
+        links = self.get_links('education_groups', queryset.filter(active=True))
+        return dict(
+            ((GROUP_ACTIVE_STUDENTS, pk, Statistic.ALWAYS), count)
+            for pk, count in links.values_list('educationgroup_id').annotate(Count('pk')).order_by())
+
+
+class LectureTracker(Tracker):
+    model = Lecture
+    fields = ('course_id', 'start', 'finish')
+    relations = ('teachers',)
+
+    def contributions(self, state):
+        if not state:
+            return {}
+        week = week_of(state['start'])
+        result = {(COURSE_WEEK_LECTURES, state['course_id'], week): 1}
+        hours = (state['finish'] - state['start']).total_seconds() / 3600.0
+        for pk in state['teachers']:
+            result[TEACHER_WEEK_HOURS, pk, week] = hours
+        return result
+
+    def bulk_contributions(self, queryset):
+        result = defaultdict(float)
+        days = queryset.annotate(day=TruncDate('start')).values_list('course_id', 'day').annotate(Count('pk'))
+        for pk, day, count in days.order_by():
+            result[COURSE_WEEK_LECTURES, pk, monday_of(day)] += count
+        duration = ExpressionWrapper(F('lecture__finish') - F('lecture__start'), output_field=DurationField())
+        hours = self.get_links('teachers', queryset).annotate(day=TruncDate('lecture__start')).values_list(
+            'teacher_id', 'day').annotate(duration=Sum(duration))
+        for pk, day, total in hours.order_by():
+            result[TEACHER_WEEK_HOURS, pk, monday_of(day)] += total.total_seconds() / 3600.0
+        return result
+
+
+TRACKERS = dict((tracker.model, tracker) for tracker in (StudentTracker(), LectureTracker()))
+
+# Through models of the tracked relations.
+RELATIONS = dict(
+    (tracker.model._meta.get_field(relation).remote_field.through, (tracker, relation))
+    for tracker in TRACKERS.values() for relation in tracker.relations)
+
+
+def apply_difference(tracker, before, after):
+    deltas = defaultdict(float)
+    for key, value in tracker.contributions(before).items():
+        deltas[key] -= value
+    for key, value in tracker.contributions(after).items():
+        deltas[key] += value
+    apply_deltas(deltas)
+
+
+def apply_deltas(deltas):
+    for (name, object_id, period), delta in deltas.items():
+        if not delta:
+            continue
+        lookup = {'name': name, 'object_id': object_id, 'period': period}
+        if Statistic.objects.filter(**lookup).update(value=F('value') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                Statistic.objects.create(value=delta, **lookup)
+        except IntegrityError:
+            # Created concurrently.
+            Statistic.objects.filter(**lookup).update(value=F('value') + delta)
+
+
+@contextmanager
+def untracked():
+    """
+    Suspend the signal handlers in this thread, for bulk writes which call
+    ``record_created()`` afterwards.
+    """
+    previous = getattr(_local, 'untracked', False)
+    _local.untracked = True
+    try:
+        yield
+    finally:
+        _local.untracked = previous
+
+
+def is_tracking():
+    return not getattr(_local, 'untracked', False)
+
+
+@contextmanager
+def bulk_tracked(queryset):
+    """
+    Apply the difference the set-based writes in the block make to the
+    contributions of the objects of *queryset*, which must match the same
+    rows before and after them, deleted ones aside.
+    """
+    tracker = TRACKERS.get(queryset.model)
+    if tracker is None:
+        yield
+        return
+    before = tracker.bulk_contributions(queryset)
+    yield
+    deltas = defaultdict(float, tracker.bulk_contributions(queryset))
+    for key, value in before.items():
+        deltas[key] -= value
+    apply_deltas(deltas)
+
+
+def record_created(model, pks):
+    """
+    Count objects of *model* created without signals, e.g. by
+    ``bulk_create()``, together with their relations.
+    """
+    tracker = TRACKERS.get(model)
+    if tracker is None or not pks:
+        return
+    deltas = defaultdict(float)
+    for state in tracker.load(pks).values():
+        for key, value in tracker.contributions(state).items():
+            deltas[key] += value
+    apply_deltas(deltas)
+
+
+def pre_save_handler(sender, instance, raw=False, **kwargs):
+    if raw or not is_tracking():
+        return
+    tracker = TRACKERS[sender]
+    instance._stats_state = tracker.load([instance.pk]).get(instance.pk) if instance.pk else None
+
+
+def post_save_handler(sender, instance, raw=False, **kwargs):
+    if raw or not is_tracking():
+        return
+    tracker = TRACKERS[sender]
+    before = getattr(instance, '_stats_state', None)
+    # A save does not change relations.
+    after = dict((relation, before[relation] if before else set()) for relation in tracker.relations)
+    after.update((field, getattr(instance, field)) for field in tracker.fields)
+    apply_difference(tracker, before, after)
+    instance._stats_state = None
+
+
+def pre_delete_handler(sender, instance, **kwargs):
+    if is_tracking():
+        instance._stats_state = TRACKERS[sender].load([instance.pk]).get(instance.pk)
+
+
+def post_delete_handler(sender, instance, **kwargs):
+    if sender in OBJECT_STATISTICS:
+        Statistic.objects.filter(name__in=OBJECT_STATISTICS[sender], object_id=instance.pk).delete()
+    if sender in TRACKERS and is_tracking():
+        apply_difference(TRACKERS[sender], getattr(instance, '_stats_state', None), None)
+
+
+def m2m_changed_handler(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if sender not in RELATIONS or not is_tracking():
+        return
+    tracker, relation = RELATIONS[sender]
+    if not reverse:
+        pks = [instance.pk]
+    elif pk_set is not None:
+        pks = list(pk_set)
+    else:
+        pks = tracker.get_related_pks(relation, instance.pk)
+    if action.startswith('pre_'):
+        instance._stats_m2m_states = tracker.load(pks)
+    elif action.startswith('post_'):
+        before = getattr(instance, '_stats_m2m_states', None) or {}
+        for pk, after in tracker.load(list(before) or pks).items():
+            apply_difference(tracker, before.get(pk), after)
+        instance._stats_m2m_states = None
+
+
+def lock_statistics(using):
+    """
+    Make writers of statistics wait until the current transaction ends.
+    PostgreSQL locks the table, so rows about to be created wait too; other
+    databases lock the existing rows.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('LOCK TABLE %s IN EXCLUSIVE MODE' % connection.ops.quote_name(Statistic._meta.db_table))
+    return Statistic.objects.using(using).select_for_update()
+
+
+def recompute():
+    """
+    Rebuild all statistics from the database, correcting any drift of the
+    incremental maintenance. Returns the number of statistics changed. The
+    statistics are locked before the totals are read, so deltas applied
+    meanwhile wait and land on top of the new totals.
+    """
+    using = router.db_for_write(Statistic)
+    with transaction.atomic(using=using):
+        current = dict(
+            ((name, object_id, period), value) for name, object_id, period, value in
+            lock_statistics(using).values_list('name', 'object_id', 'period', 'value'))
+        totals = defaultdict(float)
+        groups = Student.education_groups.through.objects.filter(student__active=True).values_list(
+            'educationgroup_id').annotate(Count('pk')).order_by()
+        for pk, count in groups:
+            totals[GROUP_ACTIVE_STUDENTS, pk, Statistic.ALWAYS] = count
+        for course_id, start in Lecture.objects.values_list('course_id', 'start').order_by().iterator():
+            totals[COURSE_WEEK_LECTURES, course_id, week_of(start)] += 1
+        teachers = Lecture.teachers.through.objects.values_list('teacher_id', 'lecture__start', 'lecture__finish')
+        for pk, start, finish in teachers.order_by().iterator():
+            totals[TEACHER_WEEK_HOURS, pk, week_of(start)] += (finish - start).total_seconds() / 3600.0
+        Statistic.objects.using(using).all().delete()
+        Statistic.objects.using(using).bulk_create(
+            Statistic(name=name, object_id=object_id, period=period, value=value)
+            for (name, object_id, period), value in totals.items() if value)
+    changed = set(key for key in current if abs(current[key] - totals.get(key, 0)) > 1e-6)
+    changed.update(key for key in totals if totals[key] and key not in current)
+    return len(changed)
+
+
+def get_home_stats(limit=10):
+    """
+    Return the headline numbers of the dashboard home page as lists of
+    ``(object, value)`` pairs, largest first.
+    """
+    week = week_of(timezone.now())
+
+    def top(name, period, model):
+        rows = list(Statistic.objects.filter(name=name, period=period, value__gt=0).order_by(
+            '-value', 'object_id').values_list('object_id', 'value')[:limit])
+        objects = model._default_manager.in_bulk([pk for pk, value in rows])
+        return [(objects[pk], value) for pk, value in rows if pk in objects]
+
+    return {
+        'week': week,
+        'group_active_students': top(GROUP_ACTIVE_STUDENTS, Statistic.ALWAYS, EducationGroup),
+        'course_week_lectures': top(COURSE_WEEK_LECTURES, week, Course),
+        'teacher_week_hours': top(TEACHER_WEEK_HOURS, week, Teacher),
+    }
@@ -1,9 +1,122 @@
+import re
+
+from django.core.exceptions import FieldDoesNotExist
+from django.template import Context, Template
+from django.template.base import render_value_in_context
+from django.template.defaultfilters import date
+from django.templatetags.l10n import localize, unlocalize
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+from django.utils.timezone import template_localtime
 from django.utils.translation import ungettext_lazy
-from django_tables2 import Table
+from django_tables2 import A, BooleanColumn, CheckBoxColumn, LinkColumn, Table, TemplateColumn
+from django_tables2.columns.base import LinkTransform
+from django_tables2.columns.linkcolumn import BaseLinkColumn
+from django_tables2.utils import AttributeDict, signature
+
+from .reverse import reverse_cached
+
+# How ``dashboard/table_bootstrap4.html`` formats a cell by ``column.localize``.
+CELL_FILTERS = {
+    None: lambda value: value,
+    True: localize,
+    False: unlocalize,
+}
+
+# The template of ``DateColumn`` and ``DateTimeColumn``, rendered without it.
+DATE_TEMPLATE = re.compile(r'^\{\{ value\|date:"([^"]*)"\|default:default \}\}$')
+
+# Stand-in for the per row part of markup rendered once per table.
+PLACEHOLDER = 918273645546372819
+
+
+class CachedLinkTransform(LinkTransform):
+
+    def call_reverse(self, record):
+        def resolve(value):
+            return value.resolve(record) if isinstance(value, A) else value
+
+        params = dict((name, resolve(value)) for name, value in self.reverse_args.items())
+        params['args'] = [resolve(value) for value in params.get('args') or ()]
+        params['kwargs'] = dict((key, resolve(value)) for key, value in (params.get('kwargs') or {}).items())
+        return reverse_cached(**params)
+
+    def __call__(self, content, **kwargs):
+        if any(callable(value) for value in (self.attrs or {}).values()):
+            return super(CachedLinkTransform, self).__call__(content, **kwargs)
+        href = self.compose_url(**kwargs)
+        if href is None:
+            return content
+        opening = self.__dict__.get('opening')
+        if opening is None:
+            # The attributes are the same on every row but the href.
+            attrs = AttributeDict(self.attrs or {})
+            attrs['href'] = PLACEHOLDER
+            opening = self.opening = ('<a %s>' % attrs.as_html()).split(str(PLACEHOLDER))
+        return mark_safe('%s%s</a>' % (conditional_escape(href).join(opening), conditional_escape(content)))
+
+
+class CachedLinkColumn(LinkColumn):
+    """
+    ``LinkColumn`` reversing its URL with ``reverse_cached()``, once per
+    process instead of once per row.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(CachedLinkColumn, self).__init__(*args, **kwargs)
+        if isinstance(self.link, LinkTransform) and self.link.reverse_args.get('viewname') is not None:
+            link = CachedLinkTransform(attrs=self.link.attrs)
+            link.reverse_args = self.link.reverse_args
+            self.link = link
+
+
+class _PlaceholderRecord(object):
+
+    def __init__(self, pk):
+        self.pk = self.id = pk
+
+
+class ActionsColumn(TemplateColumn):
+    """
+    ``TemplateColumn`` for the per row actions menu, whose template may read
+    no more of the record than ``record.pk`` or ``record.id``. It is
+    rendered once per table for a placeholder pk and every row substitutes
+    its own.
+    """
+    placeholder = PLACEHOLDER
+
+    def __init__(self, template_name, **extra):
+        extra.setdefault('orderable', False)
+        extra.setdefault('exclude_from_export', True)
+        super(ActionsColumn, self).__init__(template_name=template_name, **extra)
+
+    def render(self, record, table, value, bound_column, **kwargs):
+        snippets = table.__dict__.setdefault('_actions_snippets', {})
+        if bound_column.name not in snippets:
+            html = super(ActionsColumn, self).render(
+                _PlaceholderRecord(self.placeholder), table, value, bound_column, **kwargs)
+            snippets[bound_column.name] = html.split(str(self.placeholder))
+        return mark_safe(str(record.pk).join(snippets[bound_column.name]))
 
 
 class DashboardTable(Table):
-    caption = ungettext_lazy('%d Row', '%d Rows')
+    # Ticks the rows for ``projects.dashboard.views.BulkActionMixin``.
+    selection = CheckBoxColumn(
+        accessor='pk', exclude_from_export=True,
+        attrs={'th__input': {'class': 'bulk-toggle'}, 'td__input': {'class': 'bulk-select', 'form': 'bulk-action'}})
+
+    caption = ungettext_lazy('%s Row', '%s Rows')
+    cursor_field = 'cursor'
+    selection_field = 'selection'
+    # Record fields read by column templates (e.g. ``row_actions.html``).
+    template_fields = ('pk',)
+    # Set by ``projects.dashboard.views.ExportMixin`` for the export links.
+    export_formats = ()
+    export_trigger_param = '_export'
+    # Set by ``projects.dashboard.views.BulkActionMixin``.
+    bulk_action_form = None
+    # Render the rows of a page with ``render_rows()`` instead of the template.
+    fast_rows = True
 
     def get_caption_display(self):
         try:
@@ -12,6 +125,204 @@ class DashboardTable(Table):
             pass
         return self.caption
 
+    @property
+    def prefixed_cursor_field(self):
+        return '%s%s' % (self.prefix, self.cursor_field)
+
+    @classmethod
+    def get_related_lookups(cls):
+        """
+        Return the ``(select_related, prefetch_related)`` lookups for the
+        relations traversed by the columns of the table, so that rendering a
+        page never queries per row.
+        """
+        model = cls._meta.model
+        select_related, prefetch_related = set(), set()
+        if model is None:
+            return select_related, prefetch_related
+        exclude = cls._meta.exclude or ()
+        for name, column in cls.base_columns.items():
+            if name in exclude:
+                continue
+            opts, path, single = model._meta, [], True
+            for part in re.split(r'\.|__', column.accessor or name):
+                try:
+                    field = opts.get_field(part)
+                except FieldDoesNotExist:
+                    break
+                if not field.is_relation:
+                    break
+                path.append(part)
+                single = single and not (field.many_to_many or field.one_to_many)
+                opts = field.related_model._meta
+            if path:
+                (select_related if single else prefetch_related).add('__'.join(path))
+        return select_related, prefetch_related
+
+    @classmethod
+    def get_projection(cls):
+        """
+        Return the model fields the visible columns of the table need, for
+        ``QuerySet.only()``, or ``None`` when a column reads something that
+        is not a model field and everything has to be loaded.
+        """
+        model = cls._meta.model
+        if model is None:
+            return None
+        exclude = cls._meta.exclude or ()
+        fields = set(cls.template_fields)
+        for name, column in cls.base_columns.items():
+            if name in exclude or not column.visible:
+                continue
+            part = re.split(r'\.|__', column.accessor or name)[0]
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                if part == 'pk' or isinstance(column, TemplateColumn):
+                    continue
+                return None
+            if field.many_to_many or field.one_to_many:
+                continue
+            fields.add(field.name)
+        return fields
+
+    def get_cell_renderer(self, bound_column):
+        """
+        Return a function of a ``BoundRow`` returning the content of its cell
+        in *bound_column* as ``BoundRow.get_cell()`` does, with the signature
+        of the column's ``render`` inspected once instead of once per cell.
+        """
+        name, column = bound_column.name, bound_column.column
+        accessor = A(bound_column.accessor)
+        field = accessor.get_field(self._meta.model) if self._meta.model is not None else None
+        if getattr(field, 'choices', None):
+            # get_FOO_display() is looked up per row.
+            return lambda row: row.get_cell(name)
+        render, link = bound_column.render, bound_column.link
+        if isinstance(column, TemplateColumn) and column.template_code and render == column.render:
+            match = DATE_TEMPLATE.match(column.template_code)
+            # Compiled once instead of per cell, or not at all for dates.
+            render = self.get_date_renderer(match.group(1)) if match else self.get_template_renderer(column)
+        elif isinstance(column, BooleanColumn) and render == column.render:
+            # Without choices the markup only depends on the truth of the value.
+            render = self.get_boolean_renderer(column)
+        elif isinstance(column, CheckBoxColumn) and render == column.render and column.checked is None:
+            render = self.get_checkbox_renderer(bound_column)
+        args, kwargs_name = signature(render)
+        has_text = isinstance(column, BaseLinkColumn) and column.text is not None
+        table = self
+
+        def render_cell(row):
+            record = row.record
+            try:
+                value, check_empty = accessor.resolve(record), True
+            except Exception:
+                value, check_empty = None, not has_text
+            if check_empty and value in column.empty_values:
+                return bound_column.default
+            # The optional arguments of BoundRow.get_cell().
+            kwargs = {
+                'value': value, 'record': record, 'column': column, 'bound_column': bound_column, 'bound_row': row,
+                'table': table,
+            }
+            if kwargs_name:
+                content = render(**kwargs)
+            elif all(arg in kwargs for arg in args):
+                content = render(**dict((arg, kwargs[arg]) for arg in args))
+            else:
+                content = None
+            return link(content, **kwargs) if link else content
+        return render_cell
+
+    def get_template_renderer(self, column):
+        """
+        Return the ``render`` of the ``TemplateColumn`` *column* with its
+        ``template_code`` compiled once.
+        """
+        template = Template(column.template_code)
+
+        def render(record, value, bound_column, bound_row, **kwargs):
+            context = getattr(self, 'context', Context())
+            context.update(column.extra_context)
+            context.update({
+                'default': bound_column.default,
+                'column': bound_column,
+                'record': record,
+                'value': value,
+                'row_counter': bound_row.row_counter,
+            })
+            try:
+                return template.render(context)
+            finally:
+                context.pop()
+                context.pop()
+        return render
+
+    def get_date_renderer(self, format):
+        """
+        Return the ``render`` of a ``DateColumn`` or ``DateTimeColumn`` with
+        *format*, doing what its template does.
+        """
+        def render(value, bound_column):
+            return conditional_escape(date(template_localtime(value), format) or bound_column.default)
+        return render
+
+    def get_checkbox_renderer(self, bound_column):
+        """
+        Return the ``render`` of an unchecked ``CheckBoxColumn``, whose markup
+        only differs by the value between rows, rendered once.
+        """
+        pieces = bound_column.column.render(PLACEHOLDER, bound_column, None).split(str(PLACEHOLDER))
+
+        def render(value):
+            return mark_safe(conditional_escape(value).join(pieces))
+        return render
+
+    def get_boolean_renderer(self, column):
+        rendered = {}
+
+        def render(value, record, bound_column):
+            key = bool(value)
+            if key not in rendered:
+                rendered[key] = column.render(value, record, bound_column)
+            return rendered[key]
+        return render
+
+    def render_rows(self):
+        """
+        Render the rows of the current page like the ``table.tbody.row``
+        block of ``dashboard/table_bootstrap4.html`` would, with the cell
+        attributes, renderers and filters of every column worked out once per
+        page instead of once per cell. Returns ``None`` when the template has
+        to render them, as callable attributes are computed per row.
+        """
+        if not self.fast_rows or any(callable(value) for value in self.row_attrs.values()):
+            return None
+        cells = []
+        for bound_column in self.columns:
+            attrs = dict(self.attrs)
+            attrs.update(bound_column.column.attrs)
+            if any(callable(value) for value in attrs.get('td', attrs.get('cell', {})).values()):
+                return None
+            cells.append((
+                mark_safe('<td %s>' % bound_column.attrs['td'].as_html()),
+                self.get_cell_renderer(bound_column), CELL_FILTERS[bound_column.localize]))
+        openings = {}
+        for css_class in ('even', 'odd'):
+            attrs = AttributeDict(self.row_attrs)
+            attrs['class'] = '%s %s' % (attrs['class'], css_class) if attrs.get('class') else css_class
+            openings[css_class] = '<tr scope="row" %s>' % attrs.as_html()
+        context = Context()
+        html = []
+        for index, row in enumerate(self.paginated_rows):
+            # BoundRow.get_even_odd_css_class() for rows counted from 0.
+            html.append(openings['odd' if index % 2 else 'even'])
+            for opening, render_cell, cell_filter in cells:
+                html.extend((opening, render_value_in_context(cell_filter(render_cell(row)), context), '</td>'))
+            html.append('</tr>\n')
+        return mark_safe(''.join(html))
+
     class Meta:
         template_name = 'dashboard/table_bootstrap4.html'
+        sequence = ('selection', '...')
         attrs = {'class': 'table table-responsive-sm table-bordered table-striped table-sm'}
@@ -1,3 +1,430 @@
-from django.test import TestCase  # NOQA
+import datetime
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import ProtectedError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, get_script_prefix, reverse, set_script_prefix
+from django.utils import timezone, translation
+from django_tables2 import Table
+from projects.education.models import Course, EducationGroup, Lecture, Student, Teacher
+
+from . import group_counts, stats
+from .autocomplete import PrefixIndex
+from .bulk import bulk_delete
+from .counts import COUNT_CACHE, get_count
+from .education.seed import Seeder
+from .instrumentation import QueryStats, metrics
+from .models import Statistic
+from .pagination import KeysetPaginator, decode_cursor, encode_cursor, get_keyset_ordering
+from .reverse import reverse_cached
+from .search import SEARCH_RANK, search
+from .versions import touch
+
+User = get_user_model()
+
+BIRTH_DATE = datetime.date(2000, 1, 1)
+
+
+class PrefixIndexTests(TransactionTestCase):
+    """
+    Lookups run in memory; saves in this process show up at once, other
+    writes once the version stamp is checked again.
+    """
+
+    def test_lookups_run_no_queries(self):
+        index = PrefixIndex(Course, 'title', check_interval=60)
+        geometry = Course.objects.create(title='Geometry')
+        self.assertEqual(index.search('ge'), ([(geometry.pk, 'Geometry')], False))
+        with self.assertNumQueries(0):
+            self.assertEqual(index.search('GE'), ([(geometry.pk, 'Geometry')], False))
+
+    def test_saves_invalidate_at_once(self):
+        index = PrefixIndex(Course, 'title', check_interval=60)
+        geometry = Course.objects.create(title='Geometry')
+        index.search('ge')
+        geography = Course.objects.create(title='Geography')
+        self.assertEqual(index.search('geo'), ([(geography.pk, 'Geography'), (geometry.pk, 'Geometry')], False))
+        geometry.delete()
+        self.assertEqual(index.search('geo'), ([(geography.pk, 'Geography')], False))
+
+    def test_other_writes_show_after_interval(self):
+        index = PrefixIndex(Course, 'title', check_interval=60)
+        geometry = Course.objects.create(title='Geometry')
+        index.search('ge')
+        # Like a write of another process: no signal, only the stamp.
+        Course.objects.filter(pk=geometry.pk).update(title='Algebra')
+        touch(Course)
+        self.assertEqual(index.search('al'), ([], False))
+        index.checked -= 60
+        self.assertEqual(index.search('al'), ([(geometry.pk, 'Algebra')], False))
+
+
+class SearchTests(TestCase):
+    """
+    The column and the term are folded alike, whatever the case and accents
+    of either.
+    """
+
+    def search(self, value):
+        return list(search(Course.objects.all(), 'title', value).values_list('title', flat=True))
+
+    def test_case_and_accents_are_ignored(self):
+        Course.objects.create(title='Straße')
+        Course.objects.create(title='Łódź history')
+        Course.objects.create(title='Crème brûlée')
+        self.assertEqual(self.search('STRASSE'), ['Straße'])
+        self.assertEqual(self.search('straße'), ['Straße'])
+        self.assertEqual(self.search('lodz'), ['Łódź history'])
+        self.assertEqual(self.search('ŁÓDŹ'), ['Łódź history'])
+        self.assertEqual(self.search('creme brulee'), ['Crème brûlée'])
+        self.assertEqual(self.search('100%'), [])
+
+    def test_closer_matches_rank_first(self):
+        Course.objects.create(title='Algebra')
+        Course.objects.create(title='Linear algebra and geometry')
+        ranked = search(Course.objects.all(), 'title', 'algebra')
+        self.assertEqual([course.title for course in ranked], ['Algebra', 'Linear algebra and geometry'])
+        self.assertGreater(getattr(ranked[0], SEARCH_RANK), getattr(ranked[1], SEARCH_RANK))
+
+
+class BulkDeleteTests(TestCase):
+    """
+    Bulk deletes go through the collector, keeping the group counters and
+    the statistics right.
+    """
+
+    def setUp(self):
+        self.group = EducationGroup.objects.create(name='A1')
+        self.students = [
+            Student.objects.create(last_name='Student %d' % index, first_name='Ada', birth_date=BIRTH_DATE)
+            for index in range(3)]
+        for student in self.students:
+            student.education_groups.add(self.group)
+
+    def get_statistic(self, name, object_id):
+        return Statistic.objects.filter(name=name, object_id=object_id).values_list('value', flat=True).first()
+
+    def test_delete_students(self):
+        self.assertEqual(self.get_statistic(stats.GROUP_ACTIVE_STUDENTS, self.group.pk), 3)
+        selection = Student.objects.filter(pk__in=[student.pk for student in self.students[:2]])
+        self.assertEqual(bulk_delete(selection), 2)
+        self.assertEqual(Student.objects.count(), 1)
+        self.assertEqual(Student.education_groups.through.objects.count(), 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.student_count, 1)
+        self.assertEqual(self.get_statistic(stats.GROUP_ACTIVE_STUDENTS, self.group.pk), 1)
+
+    def test_delete_group(self):
+        self.assertEqual(bulk_delete(EducationGroup.objects.all()), 1)
+        self.assertEqual(Student.objects.count(), 3)
+        self.assertFalse(Student.education_groups.through.objects.exists())
+        self.assertIsNone(self.get_statistic(stats.GROUP_ACTIVE_STUDENTS, self.group.pk))
+
+    def test_protected_rows_are_kept(self):
+        course = Course.objects.create(title='Algebra')
+        start = timezone.now()
+        Lecture.objects.create(
+            title='Algebra 1', course=course, start=start, finish=start + datetime.timedelta(hours=1))
+        with self.assertRaises(ProtectedError):
+            bulk_delete(Course.objects.all())
+        self.assertTrue(Course.objects.exists())
+
+
+class RecomputeTests(TestCase):
+
+    def get_statistics(self):
+        rows = Statistic.objects.values_list('name', 'object_id', 'period', 'value')
+        return dict(((name, object_id, period), value) for name, object_id, period, value in rows)
+
+    def test_drift_is_corrected(self):
+        group = EducationGroup.objects.create(name='A1')
+        student = Student.objects.create(last_name='Lovelace', first_name='Ada', birth_date=BIRTH_DATE)
+        student.education_groups.add(group)
+        teacher = Teacher.objects.create(last_name='Babbage', first_name='Charles', birth_date=BIRTH_DATE)
+        course = Course.objects.create(title='Algebra')
+        start = timezone.now()
+        lecture = Lecture.objects.create(
+            title='Algebra 1', course=course, start=start, finish=start + datetime.timedelta(minutes=90))
+        lecture.teachers.add(teacher)
+        expected = self.get_statistics()
+        week = stats.week_of(start)
+        self.assertEqual(expected, {
+            (stats.GROUP_ACTIVE_STUDENTS, group.pk, Statistic.ALWAYS): 1,
+            (stats.COURSE_WEEK_LECTURES, course.pk, week): 1,
+            (stats.TEACHER_WEEK_HOURS, teacher.pk, week): 1.5,
+        })
+        self.assertEqual(stats.recompute(), 0)
+        Statistic.objects.filter(name=stats.GROUP_ACTIVE_STUDENTS).update(value=7)
+        Statistic.objects.create(name=stats.COURSE_WEEK_LECTURES, object_id=course.pk + 1, period=week, value=1)
+        self.assertEqual(stats.recompute(), 2)
+        self.assertEqual(self.get_statistics(), expected)
+
+
+class KeysetPaginatorTests(TestCase):
+    """
+    Paging forward and back under every sort the list views offer shows
+    every row once, in the order of the queryset with the pk as tie
+    breaker.
+    """
+    per_page = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        Seeder({'user': 10, 'educationgroup': 10, 'teacher': 20, 'course': 5, 'student': 40, 'lecture': 30}).run()
+
+    def walk(self, queryset):
+        rows = Table(queryset).rows
+        # A cursor which does not move on would page forever.
+        limit = queryset.count() // self.per_page + 2
+        forward, cursor = [], None
+        while len(forward) < limit:
+            page = KeysetPaginator(rows, self.per_page, cursor).page()
+            forward.append([record.pk for record in page.records])
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        backward, cursor = [forward[-1]], page.previous_cursor
+        while cursor and len(backward) < limit:
+            page = KeysetPaginator(rows, self.per_page, cursor).page()
+            backward.insert(0, [record.pk for record in page.records])
+            cursor = page.previous_cursor
+        return forward, backward
+
+    def assertPages(self, queryset):
+        paginator = KeysetPaginator(Table(queryset).rows, self.per_page)
+        expected = list(queryset.order_by(*paginator._order_by(True)).values_list('pk', flat=True))
+        self.assertGreater(len(expected), self.per_page)
+        forward, backward = self.walk(queryset)
+        self.assertEqual([pk for page in forward for pk in page], expected)
+        self.assertEqual(backward, forward)
+
+    def test_cursor_round_trip(self):
+        position = {'o': [['last_name', False]], 'v': ['Kamar', datetime.date(2000, 1, 1)], 'd': 'n'}
+        self.assertEqual(decode_cursor(encode_cursor(position)), dict(position, v=['Kamar', '2000-01-01']))
+        self.assertIsNone(decode_cursor(''))
+        self.assertIsNone(decode_cursor('not a cursor'))
+        self.assertIsNone(decode_cursor(encode_cursor(['Kamar'])))
+
+    def test_cursor_of_other_ordering_shows_first_page(self):
+        rows = Table(Student.objects.order_by('last_name')).rows
+        cursor = KeysetPaginator(rows, self.per_page).page().next_cursor
+        other = Table(Student.objects.order_by('-last_name')).rows
+        page = KeysetPaginator(other, self.per_page, cursor).page()
+        self.assertFalse(page.has_previous())
+        self.assertEqual(page.records, list(Student.objects.order_by('-last_name', 'pk')[:self.per_page]))
+
+    def test_ordering_terms(self):
+        self.assertEqual(
+            get_keyset_ordering(Student.objects.all()), [('last_name', False, False), ('id', False, False)])
+        self.assertEqual(
+            get_keyset_ordering(Lecture.objects.order_by('-course', 'start')),
+            [('course__title', True, False), ('start', False, False), ('id', False, False)])
+        self.assertEqual(
+            get_keyset_ordering(Student.objects.order_by('-user__username')),
+            [('user__username', True, True), ('id', False, False)])
+
+    def test_student_sorts(self):
+        for ordering in (('last_name',), ('-last_name',), ('-birth_date',), ('active', 'last_name'), ('user',),
+                         ('-user__username',)):
+            with self.subTest(ordering=ordering):
+                self.assertPages(Student.objects.order_by(*ordering))
+
+    def test_nulls(self):
+        self.assertTrue(Student.objects.filter(user__isnull=True).exists())
+        self.assertTrue(Student.objects.filter(user__isnull=False).exists())
+        for ordering in ('user', '-user', 'user__username', '-user__username'):
+            with self.subTest(ordering=ordering):
+                self.assertPages(Teacher.objects.order_by(ordering))
+
+    def test_related_ordering(self):
+        for ordering in (('course',), ('-course', '-start'), ('-start',)):
+            with self.subTest(ordering=ordering):
+                self.assertPages(Lecture.objects.order_by(*ordering))
+
+    def test_search_rank(self):
+        for queryset in (search(Student.objects.all(), 'last_name', 'a'), search(Lecture.objects.all(), 'title', 'e')):
+            with self.subTest(model=queryset.model.__name__):
+                ranks = set(queryset.values_list(SEARCH_RANK, flat=True))
+                self.assertGreater(len(ranks), 1)
+                self.assertPages(queryset)
+
+
+class CountTests(TransactionTestCase):
+    """
+    Exact counts are cached until a write to their tables commits, big
+    unfiltered tables are estimated.
+    """
+
+    def setUp(self):
+        caches[COUNT_CACHE].clear()
+
+    def test_counts_are_cached_until_a_write(self):
+        Course.objects.create(title='Algebra')
+        queryset = Course.objects.filter(active=True)
+        self.assertEqual(get_count(queryset), 1)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(get_count(queryset), 1)
+        # Only the version stamps are read.
+        self.assertEqual(len(context), 1)
+        self.assertNotIn('COUNT', context[0]['sql'])
+        Course.objects.create(title='Geometry')
+        self.assertEqual(get_count(queryset), 2)
+
+    def test_big_unfiltered_tables_are_estimated(self):
+        Course.objects.create(title='Algebra')
+        with mock.patch('projects.dashboard.counts.estimate_count', return_value=250000):
+            count = get_count(Course.objects.all())
+            self.assertEqual(count, 250000)
+            self.assertEqual(str(count), '~250000')
+            self.assertTrue(count.estimated)
+            self.assertEqual(get_count(Course.objects.filter(active=True)), 1)
+        with mock.patch('projects.dashboard.counts.estimate_count', return_value=10):
+            self.assertEqual(str(get_count(Course.objects.all())), '1')
+
+
+class TrackerTests(TestCase):
+    """
+    The statistics follow saves, relation changes and deletes.
+    """
+
+    def setUp(self):
+        self.group = EducationGroup.objects.create(name='A1')
+        self.student = Student.objects.create(last_name='Lovelace', first_name='Ada', birth_date=BIRTH_DATE)
+        self.teacher = Teacher.objects.create(last_name='Babbage', first_name='Charles', birth_date=BIRTH_DATE)
+        self.course = Course.objects.create(title='Algebra')
+        self.start = timezone.now()
+
+    def get_statistic(self, name, object_id, period=Statistic.ALWAYS):
+        return Statistic.objects.filter(name=name, object_id=object_id, period=period).values_list(
+            'value', flat=True).first() or 0
+
+    def test_group_active_students(self):
+        self.student.education_groups.add(self.group)
+        self.assertEqual(self.get_statistic(stats.GROUP_ACTIVE_STUDENTS, self.group.pk), 1)
+        self.student.active = False
+        self.student.save()
+        self.assertEqual(self.get_statistic(stats.GROUP_ACTIVE_STUDENTS, self.group.pk), 0)
+        self.student.active = True
+        self.student.save()
+        self.assertEqual(self.get_statistic(stats.GROUP_ACTIVE_STUDENTS, self.group.pk), 1)
+        self.group.student_set.clear()
+        self.assertEqual(self.get_statistic(stats.GROUP_ACTIVE_STUDENTS, self.group.pk), 0)
+
+    def test_lecture_weeks(self):
+        lecture = Lecture.objects.create(
+            title='Algebra 1', course=self.course, start=self.start, finish=self.start + datetime.timedelta(hours=2))
+        lecture.teachers.add(self.teacher)
+        week, next_week = stats.week_of(self.start), stats.week_of(self.start + datetime.timedelta(days=7))
+        self.assertEqual(self.get_statistic(stats.COURSE_WEEK_LECTURES, self.course.pk, week), 1)
+        self.assertEqual(self.get_statistic(stats.TEACHER_WEEK_HOURS, self.teacher.pk, week), 2)
+        lecture.start += datetime.timedelta(days=7)
+        lecture.finish += datetime.timedelta(days=7, hours=1)
+        lecture.save()
+        self.assertEqual(self.get_statistic(stats.COURSE_WEEK_LECTURES, self.course.pk, week), 0)
+        self.assertEqual(self.get_statistic(stats.COURSE_WEEK_LECTURES, self.course.pk, next_week), 1)
+        self.assertEqual(self.get_statistic(stats.TEACHER_WEEK_HOURS, self.teacher.pk, next_week), 3)
+        lecture.delete()
+        self.assertEqual(self.get_statistic(stats.COURSE_WEEK_LECTURES, self.course.pk, next_week), 0)
+        self.assertEqual(self.get_statistic(stats.TEACHER_WEEK_HOURS, self.teacher.pk, next_week), 0)
+
+
+class GroupCounterTests(TestCase):
+    """
+    The member counts of the groups follow the relations from both sides.
+    """
+
+    def setUp(self):
+        self.groups = [EducationGroup.objects.create(name='Group %d' % index) for index in range(2)]
+        self.students = [
+            Student.objects.create(last_name='Student %d' % index, first_name='Ada', birth_date=BIRTH_DATE)
+            for index in range(3)]
+
+    def assertCounts(self, *counts):
+        self.assertEqual(
+            list(EducationGroup.objects.order_by('pk').values_list('student_count', flat=True)), list(counts))
+
+    def test_relation_changes(self):
+        self.students[0].education_groups.add(*self.groups)
+        self.groups[0].student_set.add(*self.students)
+        self.assertCounts(3, 1)
+        self.students[0].education_groups.remove(self.groups[0])
+        self.assertCounts(2, 1)
+        self.groups[0].student_set.clear()
+        self.assertCounts(0, 1)
+        self.students[0].delete()
+        self.assertCounts(0, 0)
+
+    def test_lecture_counts(self):
+        course = Course.objects.create(title='Algebra')
+        start = timezone.now()
+        lecture = Lecture.objects.create(
+            title='Algebra 1', course=course, start=start, finish=start + datetime.timedelta(hours=1))
+        lecture.groups.add(self.groups[1])
+        self.assertEqual(EducationGroup.objects.get(pk=self.groups[1].pk).lecture_count, 1)
+        lecture.delete()
+        self.assertEqual(EducationGroup.objects.get(pk=self.groups[1].pk).lecture_count, 0)
+
+    def test_reconcile(self):
+        self.groups[0].student_set.add(*self.students)
+        EducationGroup.objects.update(student_count=7)
+        self.assertEqual(group_counts.reconcile(), 2)
+        self.assertCounts(3, 0)
+        self.assertEqual(group_counts.reconcile(), 0)
+
+
+class ReverseCachedTests(SimpleTestCase):
+
+    def tearDown(self):
+        set_script_prefix('/')
+
+    def test_matches_reverse(self):
+        for name in ('dashboard:education-student-update', 'dashboard:education-group-students'):
+            self.assertEqual(reverse_cached(name, kwargs={'pk': 12}), reverse(name, kwargs={'pk': 12}))
+            self.assertEqual(reverse_cached(name, args=[3]), reverse(name, args=[3]))
+        self.assertEqual(
+            reverse_cached('dashboard:education-student-list'), reverse('dashboard:education-student-list'))
+
+    def test_other_arguments_go_to_reverse(self):
+        with self.assertRaises(NoReverseMatch):
+            reverse_cached('dashboard:education-student-update', kwargs={'pk': 'abc'})
+
+    def test_script_prefix(self):
+        url = reverse_cached('dashboard:education-student-update', kwargs={'pk': 12})
+        set_script_prefix('/ostov/')
+        self.assertEqual(get_script_prefix(), '/ostov/')
+        self.assertEqual(reverse_cached('dashboard:education-student-update', kwargs={'pk': 12}), '/ostov' + url)
+
+    def test_reversed_once_per_language(self):
+        name = 'dashboard:education-student-update'
+        with mock.patch('projects.dashboard.reverse._templates', {}), \
+                mock.patch('projects.dashboard.reverse.reverse', wraps=reverse) as reversed_:
+            for language in ('en', 'de', 'en', 'de'):
+                with translation.override(language):
+                    self.assertEqual(reverse_cached(name, kwargs={'pk': 12}), reverse(name, kwargs={'pk': 12}))
+            self.assertEqual(reversed_.call_count, 2)
+
+
+class InstrumentationTests(TestCase):
+
+    def test_query_stats(self):
+        query_stats = QueryStats()
+        with connection.execute_wrapper(query_stats):
+            Course.objects.filter(pk=1).exists()
+            Course.objects.filter(pk=1).exists()
+            Course.objects.filter(pk=2).exists()
+        self.assertEqual(query_stats.count, 3)
+        self.assertEqual(query_stats.duplicates, 1)
+
+    def test_requests_are_measured(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        response = self.client.get(reverse('dashboard:education-course-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[0-9.]+;desc="\d+ queries, \d+ duplicates", total;dur=')
+        response = self.client.get(reverse('dashboard:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ostov_request_queries_count{view="dashboard:education-course-list"}', metrics.render())
+        self.assertIn(b'ostov_request_duration_seconds', response.content)
@@ -1,9 +1,10 @@
 from django.urls import include, path
 from django.contrib.auth.decorators import login_required
 
-from .views import DashboardView
+from .views import DashboardView, MetricsView
 
 urlpatterns = [
     path('education/', include('projects.dashboard.education.urls')),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('', login_required(DashboardView.as_view()), name='home'),
 ]
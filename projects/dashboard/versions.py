@@ -0,0 +1,122 @@
+import hashlib
+import threading
+from collections import defaultdict
+from functools import partial
+
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.http import quote_etag
+
+from .models import TableVersion
+
+# Bookkeeping tables no dashboard view reads, written on every login or migration.
+UNVERSIONED_APPS = ('admin', 'contenttypes', 'migrations', 'sessions')
+
+# Tables touched in the current transaction, per database alias.
+_pending = threading.local()
+
+
+def get_table_versions(tables, using=None):
+    """
+    Return a dict of the version stamps of database *tables*, which change
+    after every committed write to them, read with one query. Cached data
+    derived from the tables keys on them. Read them from the database the
+    data is read from: a replica lagging behind has the stamps of the rows
+    it has, as each stamp is bumped after the rows it stands for commit.
+    """
+    versions = dict.fromkeys(tables, 1)
+    if versions:
+        versions.update(TableVersion.objects.using(using).filter(table__in=versions).values_list('table', 'version'))
+    return versions
+
+
+def get_table_version(table, using=None):
+    return get_table_versions([table], using)[table]
+
+
+def get_version(model, using=None):
+    return get_table_version(model._meta.db_table, using)
+
+
+def get_tables_etag(tables, parts, using=None):
+    """
+    Return an ETag for the current versions of *tables* in database *using*
+    and the *parts* the response also depends on, e.g. the URL and the user.
+    """
+    versions = sorted(get_table_versions(tables, using).items())
+    key = repr(tuple(parts) + (using, versions))
+    return quote_etag(hashlib.md5(key.encode('utf-8')).hexdigest())
+
+
+def touch(*models):
+    """
+    Bump the version stamps of the tables of *models* once the current
+    transaction commits, so no reader finds a new stamp with the old rows.
+    Writes through the ORM do this from signals; call it after
+    ``QuerySet.update()``, ``bulk_create()`` and raw SQL, which send none.
+    """
+    tables = defaultdict(set)
+    for model in models:
+        tables[router.db_for_write(model)].add(model._meta.db_table)
+    for using, names in tables.items():
+        # The first callback run bumps the tables of the whole transaction.
+        _pending.__dict__.setdefault(using, set()).update(names)
+        transaction.on_commit(partial(_bump_pending, using), using=using)
+
+
+def _bump_pending(using):
+    tables = _pending.__dict__.pop(using, None)
+    if tables:
+        bump(tables)
+
+
+def bump(tables):
+    """
+    Bump the version stamps of database *tables* now.
+    """
+    tables = sorted(tables)
+    if TableVersion.objects.filter(table__in=tables).update(version=F('version') + 1) == len(tables):
+        return
+    known = set(TableVersion.objects.filter(table__in=tables).values_list('table', flat=True))
+    missing = [table for table in tables if table not in known]
+    try:
+        with transaction.atomic(using=router.db_for_write(TableVersion)):
+            TableVersion.objects.bulk_create([TableVersion(table=table, version=2) for table in missing])
+    except IntegrityError:
+        # Another process created some of them meanwhile.
+        bump(missing)
+
+
+def touch_sender(sender, **kwargs):
+    if sender._meta.app_label not in UNVERSIONED_APPS:
+        touch(sender)
+
+
+def get_queryset_tables(queryset):
+    """
+    Return the names of the tables *queryset* reads, including the joins of
+    ``select_related()`` and the tables of ``prefetch_related()`` lookups.
+    """
+    query = queryset.query.clone()
+    try:
+        query.get_compiler(queryset.db).as_sql()
+    except EmptyResultSet:
+        pass
+    tables = set(alias.table_name for alias in query.alias_map.values())
+    for lookup in queryset._prefetch_related_lookups:
+        opts = queryset.model._meta
+        for part in getattr(lookup, 'prefetch_through', lookup).split(LOOKUP_SEP):
+            try:
+                field = opts.get_field(part)
+            except FieldDoesNotExist:
+                break
+            if not field.is_relation:
+                break
+            through = getattr(field, 'through', None) or getattr(field.remote_field, 'through', None)
+            if through is not None:
+                tables.add(through._meta.db_table)
+            opts = field.related_model._meta
+            tables.add(opts.db_table)
+    return tables
@@ -1,7 +1,22 @@
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
+from django.db.models import ProtectedError
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.decorators import method_decorator
-from django.views.generic import TemplateView
+from django.utils.translation import get_language, ugettext_lazy as _
+from django.views.generic import TemplateView, View
+from django_tables2 import SingleTableView
+from projects.core.db import get_read_database
+
+from .bulk import ACTIVATE, DEACTIVATE, DELETE, BulkActionForm
+from .export import EXPORT_CONTENT_TYPES, EXPORT_WRITERS, iter_table_values
+from .instrumentation import metrics
+from .pagination import CountingPaginator, KeysetPaginator
+from .search import is_ranked
+from .stats import get_home_stats
+from .versions import get_queryset_tables, get_tables_etag
 
 
 class DashboardView(TemplateView):
@@ -12,3 +27,209 @@ class DashboardView(TemplateView):
         if not request.user.is_staff:
             raise PermissionDenied
         return super(DashboardView, self).dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        ctx = super(DashboardView, self).get_context_data(**kwargs)
+        ctx['stats'] = get_home_stats()
+        return ctx
+
+
+class MetricsView(View):
+    """
+    Request metrics of this process in the Prometheus text format.
+    """
+
+    @method_decorator(login_required)
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            raise PermissionDenied
+        return super(MetricsView, self).dispatch(request, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class VersionETagMixin(object):
+    """
+    Answer conditional GETs with 304 using an ETag derived from the version
+    stamps of the tables the view reads (see ``projects.dashboard.versions``)
+    in the database it reads them from, the URL and the user. Responses may
+    be cached privately for *cache_max_age* seconds, 0 makes browsers
+    revalidate every time.
+    """
+    etag_models = None
+    cache_max_age = 0
+
+    def get_etag_tables(self):
+        if self.etag_models is not None:
+            return set(model._meta.db_table for model in self.etag_models)
+        return get_queryset_tables(self.get_queryset())
+
+    def get_etag_database(self):
+        return None
+
+    def get_etag_parts(self, request):
+        return (request.get_full_path(), request.user.pk, get_language())
+
+    def get_etag(self, request):
+        return get_tables_etag(self.get_etag_tables(), self.get_etag_parts(request), using=self.get_etag_database())
+
+    def conditional(self, handler, request, *args, **kwargs):
+        """
+        Answer *request* with 304 when its ETag matches, otherwise with what
+        *handler* returns.
+        """
+        # Pages carrying flash messages are never reused.
+        if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+            return handler(request, *args, **kwargs)
+        etag = self.get_etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, max_age=self.cache_max_age)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        return self.conditional(super(VersionETagMixin, self).dispatch, request, *args, **kwargs)
+
+
+class ReplicaReadMixin(object):
+    """
+    Read the queryset of GET and HEAD requests from a replica database when
+    ``DATABASE_REPLICAS`` are configured (see ``projects.core.db``). Related
+    objects and prefetches follow the queryset's database, and so do the
+    version stamps of ``VersionETagMixin``.
+    """
+
+    def get_queryset(self):
+        qs = super(ReplicaReadMixin, self).get_queryset()
+        database = get_read_database(self.request)
+        if database is not None:
+            qs = qs.using(database)
+        return qs
+
+    def get_etag_database(self):
+        return get_read_database(self.request)
+
+
+class ExportMixin(object):
+    """
+    Stream the whole table of a ``SingleTableView``, searched and sorted as
+    shown, when *export_trigger_param* names one of *export_formats*.
+    """
+    export_trigger_param = '_export'
+    export_formats = ('csv', 'xlsx')
+    export_chunk_size = 2000
+    export_name = None
+
+    def get_export_format(self):
+        export_format = self.request.GET.get(self.export_trigger_param)
+        return export_format if export_format in self.export_formats else None
+
+    def get_export_filename(self, export_format):
+        name = self.export_name or self.get_table_class()._meta.model._meta.model_name
+        return '%s.%s' % (name, export_format)
+
+    def get_table(self, **kwargs):
+        table = super(ExportMixin, self).get_table(**kwargs)
+        table.export_formats = self.export_formats
+        table.export_trigger_param = self.export_trigger_param
+        return table
+
+    def get_table_pagination(self, table):
+        if self.get_export_format() is not None:
+            return False
+        return super(ExportMixin, self).get_table_pagination(table)
+
+    def get(self, request, *args, **kwargs):
+        export_format = self.get_export_format()
+        if export_format is None:
+            return super(ExportMixin, self).get(request, *args, **kwargs)
+        rows = iter_table_values(self.get_table(), chunk_size=self.export_chunk_size)
+        response = StreamingHttpResponse(
+            EXPORT_WRITERS[export_format](rows), content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = 'attachment; filename="%s"' % self.get_export_filename(export_format)
+        return response
+
+
+class BulkActionMixin(object):
+    """
+    Run the ``BulkAction`` posted with the selection column of the table on
+    the ticked rows, or on all the rows the view lists with *select_all*.
+    """
+    bulk_actions = (ACTIVATE, DEACTIVATE, DELETE)
+
+    def get_bulk_actions(self):
+        model = self.get_table_class()._meta.model
+        return [action for action in self.bulk_actions if action.is_available(model)]
+
+    def get_bulk_action_form(self, data=None):
+        actions = self.get_bulk_actions()
+        return BulkActionForm(actions, data=data) if actions else None
+
+    def get_table(self, **kwargs):
+        table = super(BulkActionMixin, self).get_table(**kwargs)
+        table.bulk_action_form = self.get_bulk_action_form()
+        if table.bulk_action_form is None:
+            table.columns.hide(table.selection_field)
+        return table
+
+    def post(self, request, *args, **kwargs):
+        form = self.get_bulk_action_form(request.POST)
+        if form is None:
+            raise PermissionDenied
+        if form.is_valid():
+            try:
+                count = form.run(self.get_queryset())
+            except ProtectedError:
+                messages.error(request, _('Some of the rows are still in use and cannot be deleted'))
+            else:
+                messages.info(request, form.get_action().message % count)
+        else:
+            for errors in form.errors.values():
+                for error in errors:
+                    messages.error(request, error)
+        return HttpResponseRedirect(request.get_full_path())
+
+
+class DashboardListView(BulkActionMixin, ReplicaReadMixin, ExportMixin, VersionETagMixin, SingleTableView):
+    """
+    Base for list views rendering a ``DashboardTable``.
+    """
+    paginator_class = CountingPaginator
+
+    def get_queryset(self):
+        qs = super(DashboardListView, self).get_queryset()
+        select_related, prefetch_related = self.get_table_class().get_related_lookups()
+        if select_related:
+            qs = qs.select_related(*sorted(select_related))
+        if prefetch_related:
+            qs = qs.prefetch_related(*sorted(prefetch_related))
+        projection = self.get_table_class().get_projection()
+        if projection is not None:
+            qs = qs.only(*sorted(projection))
+        return qs
+
+    def get_table(self, **kwargs):
+        if is_ranked(self.get_table_data()):
+            # Keep the search ranking unless a column sort is requested.
+            kwargs.setdefault('order_by', ())
+        return super(DashboardListView, self).get_table(**kwargs)
+
+
+class KeysetPaginationMixin(object):
+    """
+    Opt-in for ``SingleTableView`` subclasses rendering a ``DashboardTable``:
+    pages are fetched with ``KeysetPaginator`` and addressed by the table's
+    cursor field instead of a page number.
+    """
+    paginator_class = KeysetPaginator
+
+    def get_table_pagination(self, table):
+        paginate = super(KeysetPaginationMixin, self).get_table_pagination(table)
+        if paginate is False:
+            return paginate
+        paginate['cursor'] = self.request.GET.get(table.prefixed_cursor_field)
+        return paginate
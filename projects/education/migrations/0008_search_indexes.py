@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# Trigram indexes over case and accent folded text, used by the dashboard
+# search forms (see projects.dashboard.search). PostgreSQL only, other
+# backends search without an index.
+SEARCH_COLUMNS = (
+    ('education_student', 'last_name'),
+    ('education_teacher', 'last_name'),
+    ('education_educationgroup', 'name'),
+    ('education_course', 'title'),
+    ('education_lecture', 'title'),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    # unaccent() itself is only STABLE, the two argument form with a fixed
+    # dictionary is safe to wrap in an IMMUTABLE function usable in indexes.
+    schema_editor.execute(
+        "CREATE OR REPLACE FUNCTION ostov_search_normalize(text) RETURNS text AS "
+        "$$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, $1)) $$ "
+        "LANGUAGE sql IMMUTABLE STRICT")
+    for table, column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS %s_%s_trgm ON %s USING gin (ostov_search_normalize(%s) gin_trgm_ops)' % (
+                table, column, table, column))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in SEARCH_COLUMNS:
+        schema_editor.execute('DROP INDEX IF EXISTS %s_%s_trgm' % (table, column))
+    schema_editor.execute('DROP FUNCTION IF EXISTS ostov_search_normalize(text)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0007_auto_20180927_1628'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# GiST index over the lecture periods, used by the double-booking checks of
+# projects.education.timetable. PostgreSQL only, other backends compare start
+# and finish without it. tstzrange() rejects a finish before the start, so
+# such rows, saved before the forms checked it, are swapped round first, and
+# a check constraint keeps new ones out.
+
+
+def create_period_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'UPDATE education_lecture SET start = finish, finish = start WHERE finish < start')
+    schema_editor.execute(
+        'ALTER TABLE education_lecture ADD CONSTRAINT education_lecture_finish_after_start '
+        'CHECK (finish >= start)')
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS education_lecture_period_gist ON education_lecture "
+        "USING gist (tstzrange(start, finish, '[)'))")
+
+
+def drop_period_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS education_lecture_period_gist')
+    schema_editor.execute(
+        'ALTER TABLE education_lecture DROP CONSTRAINT IF EXISTS education_lecture_finish_after_start')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0008_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_period_index, drop_period_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.0.7 on 2026-10-18 10:50
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_members(apps, schema_editor):
+    EducationGroup = apps.get_model('education', 'EducationGroup')
+    Student = apps.get_model('education', 'Student')
+    Lecture = apps.get_model('education', 'Lecture')
+
+    def count(through):
+        return Coalesce(Subquery(
+            through.objects.filter(educationgroup=OuterRef('pk')).order_by().values('educationgroup').annotate(
+                count=Count('pk')).values('count')), 0)
+
+    EducationGroup.objects.update(
+        student_count=count(Student.education_groups.through),
+        lecture_count=count(Lecture.groups.through))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0010_lecture_period_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='educationgroup',
+            name='lecture_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Lectures'),
+        ),
+        migrations.AddField(
+            model_name='educationgroup',
+            name='student_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Students'),
+        ),
+        migrations.RunPython(count_members, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+# Case-insensitive prefix indexes for the student autocomplete of the group
+# roster (see projects.dashboard.search.search_prefix). PostgreSQL only.
+SEARCH_COLUMNS = ('last_name', 'first_name')
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS education_student_%s_lower ON education_student '
+            '(lower(%s) text_pattern_ops)' % (column, column))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute('DROP INDEX IF EXISTS education_student_%s_lower' % column)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0011_educationgroup_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
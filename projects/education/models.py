@@ -34,6 +34,9 @@ class EducationGroup(models.Model):
     name = models.CharField(_('Name'), blank=False, max_length=200, db_index=True)
     description = models.TextField(_('Description'), blank=True)
     active = models.BooleanField(_('Status'), default=True)
+    # Maintained by projects.dashboard.group_counts.
+    student_count = models.PositiveIntegerField(_('Students'), default=0, editable=False)
+    lecture_count = models.PositiveIntegerField(_('Lectures'), default=0, editable=False)
 
     def __str__(self):
         return self.name
@@ -94,6 +97,8 @@ class Lecture(models.Model):
 
     class Meta:
         ordering = ['title']
+        # Calendar range queries (start < to AND finish > from).
+        indexes = [models.Index(fields=['start', 'finish'], name='education_lecture_period_idx')]
         verbose_name = _('Lecture')
         verbose_name_plural = _('Lecture')
 
@@ -1,3 +1,94 @@
-from django.test import TestCase  # NOQA
+import datetime
+import random
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .models import Course, EducationGroup, Lecture, Teacher
+from .timetable import Conflict, IntervalTree, find_batch_conflicts, find_conflicts
+
+BIRTH_DATE = datetime.date(1970, 1, 1)
+
+
+class IntervalTreeTests(SimpleTestCase):
+
+    def test_search_matches_a_scan(self):
+        rng = random.Random(1)
+        intervals = []
+        for value in range(300):
+            start = rng.randrange(1000)
+            intervals.append((start, start + rng.randrange(1, 50), value))
+        tree = IntervalTree(intervals)
+        self.assertEqual(len(tree), 300)
+        for index in range(200):
+            start = rng.randrange(1050)
+            finish = start + rng.randrange(1, 60)
+            expected = sorted(value for low, high, value in intervals if low < finish and high > start)
+            self.assertEqual(sorted(tree.search(start, finish)), expected)
+
+    def test_periods_are_half_open(self):
+        tree = IntervalTree([(10, 20, 'a')])
+        self.assertEqual(tree.search(20, 30), [])
+        self.assertEqual(tree.search(0, 10), [])
+        self.assertEqual(tree.search(19, 30), ['a'])
+
+    def test_empty(self):
+        self.assertEqual(IntervalTree([]).search(0, 10), [])
+
+
+class ConflictTests(TestCase):
+
+    def setUp(self):
+        self.course = Course.objects.create(title='Algebra')
+        self.teacher = Teacher.objects.create(last_name='Noether', first_name='Emmy', birth_date=BIRTH_DATE)
+        self.other_teacher = Teacher.objects.create(last_name='Hilbert', first_name='David', birth_date=BIRTH_DATE)
+        self.group = EducationGroup.objects.create(name='A1')
+        self.start = timezone.now().replace(microsecond=0)
+        self.lecture = self.create_lecture(self.start, self.start + datetime.timedelta(hours=1))
+
+    def create_lecture(self, start, finish):
+        lecture = Lecture.objects.create(title='Algebra', course=self.course, start=start, finish=finish)
+        lecture.teachers.add(self.teacher)
+        lecture.groups.add(self.group)
+        return lecture
+
+    def at(self, minutes):
+        return self.start + datetime.timedelta(minutes=minutes)
+
+    def test_overlap(self):
+        self.assertEqual(find_conflicts(self.at(30), self.at(90), teachers=[self.teacher.pk]), [
+            Conflict('teachers', self.teacher.pk, self.lecture.pk)])
+        self.assertEqual(find_conflicts(self.at(-30), self.at(30), groups=[self.group.pk]), [
+            Conflict('groups', self.group.pk, self.lecture.pk)])
+
+    def test_adjacent_periods_do_not_conflict(self):
+        self.assertEqual(find_conflicts(self.at(60), self.at(120), [self.teacher.pk], [self.group.pk]), [])
+        self.assertEqual(find_conflicts(self.at(-60), self.at(0), [self.teacher.pk], [self.group.pk]), [])
+
+    def test_other_resources_and_the_edited_lecture_do_not_conflict(self):
+        self.assertEqual(find_conflicts(self.at(0), self.at(60), teachers=[self.other_teacher.pk]), [])
+        self.assertEqual(find_conflicts(
+            self.at(30), self.at(90), [self.teacher.pk], [self.group.pk], exclude=self.lecture.pk), [])
+
+    def test_batch(self):
+        conflicts = find_batch_conflicts([
+            ('new', self.at(30), self.at(90), [self.teacher.pk], []),
+            ('free', self.at(60), self.at(120), [self.other_teacher.pk], []),
+            ('clash', self.at(100), self.at(110), [self.other_teacher.pk], []),
+        ])
+        self.assertEqual(sorted(conflicts, key=repr), sorted([
+            ('new', Conflict('teachers', self.teacher.pk, self.lecture.pk)),
+            ('free', Conflict('teachers', self.other_teacher.pk, 'clash')),
+            ('clash', Conflict('teachers', self.other_teacher.pk, 'free')),
+        ], key=repr))
+
+    def test_batch_checks_saved_lectures_with_their_new_period(self):
+        conflicts = find_batch_conflicts([
+            ('new', self.at(30), self.at(90), [self.teacher.pk], []),
+            (self.lecture.pk, self.at(200), self.at(260), [self.teacher.pk], [self.group.pk]),
+            ('later', self.at(240), self.at(300), [], [self.group.pk]),
+        ])
+        self.assertEqual(sorted(conflicts, key=repr), sorted([
+            (self.lecture.pk, Conflict('groups', self.group.pk, 'later')),
+            ('later', Conflict('groups', self.group.pk, self.lecture.pk)),
+        ], key=repr))
@@ -0,0 +1,192 @@
+from collections import defaultdict, namedtuple
+from operator import itemgetter
+
+from django.db.models import BooleanField, DateTimeField, Func, Value
+
+from .models import Lecture
+
+# The lecture relations conflicts are looked for in.
+RESOURCE_FIELDS = ('teachers', 'groups')
+
+Conflict = namedtuple('Conflict', 'field resource_id lecture_id')
+
+
+class ConflictError(Exception):
+    """
+    Raised by lecture writes which find *conflicts* once the timetable of
+    the teachers and groups involved is locked.
+    """
+
+    def __init__(self, conflicts):
+        super(ConflictError, self).__init__('%d timetable conflicts' % len(conflicts))
+        self.conflicts = conflicts
+
+
+class PeriodOverlaps(Func):
+    """
+    True when the half-open period ``[start, finish)`` of a row overlaps the
+    given one. On PostgreSQL it is written as a ``tstzrange`` overlap so the
+    GiST index of ``education.0009_lecture_period_index`` answers it.
+    """
+    output_field = BooleanField()
+
+    def __init__(self, start, finish, period_start, period_finish, **extra):
+        super(PeriodOverlaps, self).__init__(
+            start, finish,
+            Value(period_start, output_field=DateTimeField()),
+            Value(period_finish, output_field=DateTimeField()), **extra)
+
+    def compile_expressions(self, compiler):
+        return [compiler.compile(expression) for expression in self.get_source_expressions()]
+
+    def as_sql(self, compiler, connection, **extra_context):
+        (start, start_params), (finish, finish_params), (period_start, period_start_params), \
+            (period_finish, period_finish_params) = self.compile_expressions(compiler)
+        return '(%s < %s AND %s > %s)' % (start, period_finish, finish, period_start), (
+            list(start_params) + list(period_finish_params) + list(finish_params) + list(period_start_params))
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = zip(*self.compile_expressions(compiler))
+        return "(tstzrange(%s, %s, '[)') && tstzrange(%s, %s, '[)'))" % sql, [p for ps in params for p in ps]
+
+
+def overlapping(queryset, start, finish, prefix=''):
+    """
+    Filter *queryset* to rows whose ``start``/``finish`` period, reached
+    through *prefix*, overlaps ``[start, finish)``.
+    """
+    return queryset.annotate(period_overlaps=PeriodOverlaps(
+        prefix + 'start', prefix + 'finish', start, finish)).filter(period_overlaps=True)
+
+
+def get_through(field):
+    """
+    Return the through model of the lecture relation *field* with the names
+    of its lecture and resource foreign keys.
+    """
+    m2m = Lecture._meta.get_field(field)
+    return m2m.remote_field.through, m2m.m2m_field_name(), m2m.m2m_reverse_field_name()
+
+
+def lock_resources(teachers=(), groups=()):
+    """
+    Lock the rows of the *teachers* and *groups* pks, in pk order, until the
+    end of the transaction, so that lecture writes sharing one of them check
+    for conflicts and save one after the other.
+    """
+    for field, pks in zip(RESOURCE_FIELDS, (teachers, groups)):
+        if pks:
+            model = Lecture._meta.get_field(field).related_model
+            list(model._default_manager.select_for_update().filter(pk__in=list(pks)).order_by('pk').values_list(
+                'pk', flat=True))
+
+
+def find_conflicts(start, finish, teachers=(), groups=(), exclude=None):
+    """
+    Return a ``Conflict`` for every lecture overlapping ``[start, finish)``
+    which shares one of the *teachers* or *groups* pks, with one query per
+    relation. *exclude* is the pk of the lecture being edited.
+    """
+    conflicts = []
+    for field, pks in zip(RESOURCE_FIELDS, (teachers, groups)):
+        if not pks:
+            continue
+        through, lecture, resource = get_through(field)
+        qs = overlapping(through.objects.all(), start, finish, prefix=lecture + '__')
+        qs = qs.filter(**{resource + '_id__in': list(pks)})
+        if exclude is not None:
+            qs = qs.exclude(**{lecture + '_id': exclude})
+        conflicts.extend(
+            Conflict(field, resource_pk, lecture_pk)
+            for resource_pk, lecture_pk in qs.order_by(lecture + '__start').values_list(
+                resource + '_id', lecture + '_id'))
+    return conflicts
+
+
+class IntervalTree(object):
+    """
+    Static interval tree over ``(start, finish, value)`` triples: a list
+    sorted by start, read as an implicit balanced binary tree where every
+    node knows the latest finish below it.
+    """
+
+    def __init__(self, intervals):
+        self.intervals = sorted(intervals, key=itemgetter(0))
+        self.max_finish = [None] * len(self.intervals)
+        self._build(0, len(self.intervals))
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def _build(self, low, high):
+        if low >= high:
+            return None
+        middle = (low + high) // 2
+        latest = self.intervals[middle][1]
+        for child in (self._build(low, middle), self._build(middle + 1, high)):
+            if child is not None and child > latest:
+                latest = child
+        self.max_finish[middle] = latest
+        return latest
+
+    def search(self, start, finish):
+        """
+        Return the values of the intervals overlapping ``[start, finish)``.
+        """
+        found = []
+        stack = [(0, len(self.intervals))]
+        while stack:
+            low, high = stack.pop()
+            if low >= high:
+                continue
+            middle = (low + high) // 2
+            if self.max_finish[middle] <= start:
+                continue
+            stack.append((low, middle))
+            interval_start, interval_finish, value = self.intervals[middle]
+            if interval_start < finish:
+                if interval_finish > start:
+                    found.append(value)
+                stack.append((middle + 1, high))
+        return found
+
+
+def find_batch_conflicts(candidates):
+    """
+    Check many lectures at once. *candidates* are ``(key, start, finish,
+    teacher_pks, group_pks)`` tuples, where *key* is the pk of a saved
+    lecture or a hashable no lecture pk equals. The timetable of every
+    teacher and group involved is loaded with one query per relation and
+    indexed in ``IntervalTree``s, so a year of candidates still costs two
+    queries. Returns ``(key, Conflict)`` pairs, conflicts between two
+    candidates carry the other key as ``lecture_id``.
+    """
+    candidates = list(candidates)
+    if not candidates:
+        return []
+    period_start = min(candidate[1] for candidate in candidates)
+    period_finish = max(candidate[2] for candidate in candidates)
+    keys = set(candidate[0] for candidate in candidates)
+    conflicts = []
+    for index, field in enumerate(RESOURCE_FIELDS):
+        intervals = defaultdict(list)
+        for key, start, finish, teachers, groups in candidates:
+            for pk in (teachers, groups)[index]:
+                intervals[pk].append((start, finish, key))
+        if not intervals:
+            continue
+        through, lecture, resource = get_through(field)
+        qs = overlapping(through.objects.all(), period_start, period_finish, prefix=lecture + '__')
+        qs = qs.filter(**{resource + '_id__in': list(intervals)})
+        for resource_pk, lecture_pk, start, finish in qs.values_list(
+                resource + '_id', lecture + '_id', lecture + '__start', lecture + '__finish'):
+            # Saved candidates are checked with their new period.
+            if lecture_pk not in keys:
+                intervals[resource_pk].append((start, finish, lecture_pk))
+        trees = dict((pk, IntervalTree(periods)) for pk, periods in intervals.items())
+        for key, start, finish, teachers, groups in candidates:
+            for pk in (teachers, groups)[index]:
+                conflicts.extend(
+                    (key, Conflict(field, pk, other))
+                    for other in trees[pk].search(start, finish) if other != key)
+    return conflicts
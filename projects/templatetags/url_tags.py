@@ -0,0 +1,13 @@
+from django import template
+from projects.dashboard.reverse import reverse_cached
+
+register = template.Library()
+
+
+@register.simple_tag
+def cached_url(viewname, *args, **kwargs):
+    """
+    ``{% url %}`` for per row links, see
+    ``projects.dashboard.reverse.reverse_cached``.
+    """
+    return reverse_cached(viewname, args=args, kwargs=kwargs)